@@ -1,4 +1,19 @@
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+import importlib.util
+from itertools import islice
 import math
+import os
+import tempfile
+
+# Number of times in a row one run has to win a merge before
+# hybrid_sort switches to galloping.
+MIN_GALLOP = 7
+
+# Estimated bytes per number held in memory by external_sort: a list
+# slot and a float object, plus the array the chunk is written from.
+EXTERNAL_ITEM_BYTES = 40
 
 def insertion_sort(lst):
     """
@@ -23,7 +38,7 @@ def merge_sort(lst, p, r):
         r: ending index of the list, i.e. len(lst) - 1
     """
     if p < r:
-        q = math.floor((p + r) / 2)
+        q = (p + r) // 2
         merge_sort(lst, p, q)
         merge_sort(lst, q+1, r)
         merge(lst, p, q, r)
@@ -60,3 +75,452 @@ def merge(lst, p, q, r):
         else:
             lst[k] = R[j]
             j = j + 1
+
+
+def bottom_up_merge_sort(lst):
+    """
+    Sorts the list lst in place using an iterative, bottom-up merge sort.
+
+    Runs of width 1, 2, 4, ... are merged pairwise from one list into
+    the other, switching between lst and a single buffer that is
+    allocated once, so no recursion is needed. Runs that are already
+    in order and the tail left over by each merge are copied with a
+    slice, which makes a short-lived temporary list but is much faster
+    on presorted input than copying item by item.
+    The merge does not use sentinels, so any keys that support < can
+    be sorted (strings, tuples, ...). The sort is stable.
+    """
+    n = len(lst)
+    if n < 2:
+        return
+    src = lst
+    dst = [None] * n
+    width = 1
+    while width < n:
+        for lo in range(0, n, 2 * width):
+            mid = min(lo + width, n)
+            hi = min(lo + 2 * width, n)
+            if mid == hi or not src[mid] < src[mid - 1]:
+                # the runs are already in order
+                dst[lo:hi] = src[lo:hi]
+                continue
+            i = lo
+            j = mid
+            k = lo
+            while i < mid and j < hi:
+                if src[j] < src[i]:
+                    dst[k] = src[j]
+                    j += 1
+                else:
+                    dst[k] = src[i]
+                    i += 1
+                k += 1
+            if i < mid:
+                dst[k:hi] = src[i:mid]
+            else:
+                dst[k:hi] = src[j:hi]
+        src, dst = dst, src
+        width *= 2
+    if src is not lst:
+        lst[:] = src
+
+
+def binary_insertion_sort(lst, lo=0, hi=None, start=None):
+    """
+    Sorts lst[lo:hi] in place using insertion sort, finding where
+    each element goes with a binary search and moving the larger
+    elements up with one slice assignment.
+
+    Args:
+        lst: list to be sorted
+        lo: starting index of the slice, i.e. 0
+        hi: index after the end of the slice, i.e. len(lst)
+        start: lst[lo:start] is already sorted (defaults to lo + 1)
+    """
+    if hi is None:
+        hi = len(lst)
+    if start is None:
+        start = lo + 1
+    for j in range(max(start, lo + 1), hi):
+        key = lst[j]
+        i = bisect_right(lst, key, lo, j)
+        if i < j:
+            lst[i + 1:j + 1] = lst[i:j]
+            lst[i] = key
+
+
+def _count_run(lst, lo, hi):
+    """
+    Returns the end of the run that starts at lo: the longest slice
+    lst[lo:end] that is either ascending or strictly descending.
+    Descending runs are reversed in place (being strict keeps the
+    sort stable).
+    """
+    end = lo + 1
+    if end >= hi:
+        return hi
+    if lst[end] < lst[lo]:
+        end += 1
+        while end < hi and lst[end] < lst[end - 1]:
+            end += 1
+        lst[lo:end] = lst[lo:end][::-1]
+    else:
+        end += 1
+        while end < hi and not lst[end] < lst[end - 1]:
+            end += 1
+    return end
+
+
+def _gallop(a, key, lo, hi, right):
+    """
+    Finds where key goes in the sorted slice a[lo:hi] by probing
+    lo, lo+1, lo+3, lo+7, ... and then doing a binary search between
+    the last two probes, which costs O(log d) for an answer d places
+    from lo. Goes after equal keys if right is True, before them
+    otherwise.
+    """
+    prev = lo
+    probe = lo
+    step = 1
+    while probe < hi and (not key < a[probe] if right else a[probe] < key):
+        prev = probe + 1
+        probe += step
+        step *= 2
+    bisect = bisect_right if right else bisect_left
+    return bisect(a, key, prev, min(probe, hi))
+
+
+def _merge_runs(lst, lo, mid, hi):
+    """
+    Merges the sorted runs lst[lo:mid] and lst[mid:hi] in place.
+
+    Elements at the start of the first run and the end of the second
+    run that are already in place are skipped, and only what is left
+    of the first run is copied. When one run wins MIN_GALLOP times in
+    a row, the merge gallops to find how many more of its elements
+    come next and moves them as one block.
+    """
+    lo = bisect_right(lst, lst[mid], lo, mid)
+    if lo == mid:
+        return
+    hi = bisect_left(lst, lst[mid - 1], mid, hi)
+    left = lst[lo:mid]
+    n1 = mid - lo
+    i = 0
+    j = mid
+    k = lo
+    left_wins = 0
+    right_wins = 0
+    while i < n1 and j < hi:
+        if lst[j] < left[i]:
+            lst[k] = lst[j]
+            j += 1
+            k += 1
+            right_wins += 1
+            left_wins = 0
+            if right_wins >= MIN_GALLOP and j < hi:
+                end = _gallop(lst, left[i], j, hi, False)
+                lst[k:k + end - j] = lst[j:end]
+                k += end - j
+                j = end
+                right_wins = 0
+        else:
+            lst[k] = left[i]
+            i += 1
+            k += 1
+            left_wins += 1
+            right_wins = 0
+            if left_wins >= MIN_GALLOP and i < n1:
+                end = _gallop(left, lst[j], i, n1, True)
+                lst[k:k + end - i] = left[i:end]
+                k += end - i
+                i = end
+                left_wins = 0
+    if i < n1:
+        lst[k:hi] = left[i:n1]
+
+
+def _merge_at(lst, runs, n):
+    """
+    Merges runs[n] and runs[n + 1] of the run stack.
+    """
+    lo, length1 = runs[n]
+    length2 = runs[n + 1][1]
+    _merge_runs(lst, lo, lo + length1, lo + length1 + length2)
+    runs[n] = (lo, length1 + length2)
+    del runs[n + 1]
+
+
+def _min_run_length(n, threshold):
+    """
+    Returns a minimum run length between threshold / 2 and threshold
+    such that n / min_run is a power of two or a bit less, which keeps
+    the final merges balanced.
+    """
+    r = 0
+    while n >= threshold:
+        r |= n & 1
+        n >>= 1
+    return n + r
+
+
+def hybrid_sort(lst, threshold=64):
+    """
+    Sorts the list lst in place using a hybrid of merge sort and
+    insertion sort in the style of Timsort. The sort is stable and
+    only needs < on the keys.
+
+    The list is split into natural runs (ascending or strictly
+    descending), and runs shorter than a minimum length are extended
+    with binary_insertion_sort. Runs are merged from a stack whose run
+    lengths grow like the Fibonacci numbers, so the merges stay
+    balanced, and merges gallop through long stretches taken from one
+    run. Sorted and reversed lists take O(n) time; the worst case is
+    O(n log n).
+
+    Args:
+        lst: list to be sorted
+        threshold: lists shorter than this are sorted with
+            binary_insertion_sort alone; runs are extended to between
+            threshold / 2 and threshold elements
+    """
+    n = len(lst)
+    if n < 2:
+        return
+    if n < threshold:
+        binary_insertion_sort(lst, 0, n, _count_run(lst, 0, n))
+        return
+    min_run = _min_run_length(n, threshold)
+    runs = []
+    lo = 0
+    while lo < n:
+        end = _count_run(lst, lo, n)
+        if end - lo < min_run:
+            forced = min(lo + min_run, n)
+            binary_insertion_sort(lst, lo, forced, end)
+            end = forced
+        runs.append((lo, end - lo))
+        lo = end
+        # keep runs[-3] > runs[-2] + runs[-1] and runs[-2] > runs[-1]
+        while len(runs) > 1:
+            i = len(runs) - 2
+            if (i > 0 and runs[i - 1][1] <= runs[i][1] + runs[i + 1][1]) or \
+                    (i > 1 and runs[i - 2][1] <= runs[i - 1][1] + runs[i][1]):
+                if runs[i - 1][1] < runs[i + 1][1]:
+                    i -= 1
+            elif runs[i][1] > runs[i + 1][1]:
+                break
+            _merge_at(lst, runs, i)
+    while len(runs) > 1:
+        i = len(runs) - 2
+        if i > 0 and runs[i - 1][1] < runs[i + 1][1]:
+            i -= 1
+        _merge_at(lst, runs, i)
+
+
+def _read_numbers(flname, typecode):
+    """
+    Reads a text file with one number per line, skipping blank lines.
+    Without a typecode, lines that are not integers are read as floats.
+    """
+    if typecode is None:
+        parse = _parse_number
+    else:
+        parse = float if typecode in "fd" else int
+    with open(flname) as fl:
+        for line in fl:
+            if line.strip():
+                yield parse(line)
+
+
+def _parse_number(line):
+    """
+    Parses a line as an int, or as a float if it is not an integer.
+    """
+    try:
+        return int(line)
+    except ValueError:
+        return float(line)
+
+
+def _infer_typecode(values):
+    """
+    Returns "q" if all the values are integers and "d" otherwise.
+    """
+    return "q" if all(isinstance(value, int) for value in values) else "d"
+
+
+def _write_run(values, flname, typecode, block_size):
+    """
+    Writes numbers to a binary run file as arrays of typecode,
+    block_size numbers at a time.
+    """
+    with open(flname, "wb") as fl:
+        if isinstance(values, list):
+            array(typecode, values).tofile(fl)
+            return
+        block = array(typecode)
+        for value in values:
+            block.append(value)
+            if len(block) >= block_size:
+                block.tofile(fl)
+                del block[:]
+        block.tofile(fl)
+
+
+def _read_run(flname, typecode, block_size):
+    """
+    Yields the numbers of a binary run file, reading block_size
+    numbers at a time.
+    """
+    with open(flname, "rb") as fl:
+        while True:
+            block = array(typecode)
+            try:
+                block.fromfile(fl, block_size)
+            except EOFError:
+                # the last, short block has still been read
+                yield from block
+                return
+            yield from block
+
+
+# Lab4/heap.py, loaded by _load_heap on first use
+_heap_module = None
+
+def _load_heap():
+    """
+    Loads Lab4/heap.py by its path, without adding Lab4 to sys.path.
+    """
+    global _heap_module
+    if _heap_module is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Lab4", "heap.py")
+        spec = importlib.util.spec_from_file_location("heap", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _heap_module = module
+    return _heap_module
+
+
+def _kway_merge(flnames, typecode, block_size):
+    """
+    Merges sorted run files into one sorted stream. The smallest
+    unmerged number of every run is kept in a max heap from
+    Lab4/heap.py as a (-number, run) entry, and each output number
+    costs one max_heap_replace.
+    """
+    heap_module = _load_heap()
+    build_max_heap = heap_module.build_max_heap
+    heap_extract_max = heap_module.heap_extract_max
+    max_heap_replace = heap_module.max_heap_replace
+
+    runs = [_read_run(flname, typecode, block_size) for flname in flnames]
+    heap = []
+    for i, run in enumerate(runs):
+        for value in run:
+            heap.append((-value, i))
+            break
+    build_max_heap(heap)
+    while heap:
+        key, i = heap[0]
+        yield -key
+        value = next(runs[i], None)
+        if value is None:
+            heap_extract_max(heap)
+        else:
+            max_heap_replace(heap, (-value, i))
+
+
+def _external_sort(values, chunk_size, block_size, fan_in, tmpdir, typecode):
+    """
+    Generator behind external_sort. The temporary directory is removed
+    when the generator finishes or is closed.
+    """
+    with tempfile.TemporaryDirectory(prefix="external_sort_", dir=tmpdir) as directory:
+        runs = []
+        chunk = list(islice(values, chunk_size))
+        inferred = typecode is None
+        if inferred:
+            typecode = _infer_typecode(chunk)
+        if len(chunk) < chunk_size:
+            # everything fits in memory; the values still go through the
+            # typecode so they come out as they would from the run files
+            yield from sorted(array(typecode, chunk))
+            return
+        while chunk:
+            if inferred and typecode == "q" and _infer_typecode(chunk) == "d":
+                # a float after integer-only chunks: store every run as floats
+                typecode = "d"
+                for flname in runs:
+                    _write_run(_read_run(flname, "q", block_size), flname + ".d",
+                               typecode, block_size)
+                    os.replace(flname + ".d", flname)
+            chunk.sort()
+            flname = os.path.join(directory, "run%d" % len(runs))
+            _write_run(chunk, flname, typecode, block_size)
+            runs.append(flname)
+            chunk = list(islice(values, chunk_size))
+        n_runs = len(runs)
+        while len(runs) > fan_in:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                flname = os.path.join(directory, "run%d" % n_runs)
+                n_runs += 1
+                _write_run(_kway_merge(runs[i:i + fan_in], typecode, block_size),
+                           flname, typecode, block_size)
+                for run in runs[i:i + fan_in]:
+                    os.remove(run)
+                merged.append(flname)
+            runs = merged
+        yield from _kway_merge(runs, typecode, block_size)
+
+
+def external_sort(data, output=None, memory_limit=64 * 2 ** 20, fan_in=16,
+                  tmpdir=None, typecode=None):
+    """
+    Sorts numbers that do not fit in memory.
+
+    The input is read in chunks of about memory_limit bytes, each chunk
+    is sorted in memory and written to a temporary run file as a binary
+    array of typecode. The runs are then merged fan_in at a time with a
+    heap until at most fan_in are left, and those are merged into the
+    output. Only one chunk, or one read buffer per merged run, is held in
+    memory at a time.
+
+    Args:
+        data: an iterable of numbers, or the name of a text file with
+            one number per line
+        output: name of a text file to write the sorted numbers to, one
+            per line; if None, a generator of the sorted numbers is
+            returned instead
+        memory_limit: approximate number of bytes to use
+        fan_in: number of runs merged at once (at least 2)
+        tmpdir: directory for the run files (the system default if None)
+        typecode: array typecode the runs are stored as, i.e. "d" for
+            floats or "q" for 64-bit integers; if None, "q" is used
+            while the input holds only integers, and the runs switch to
+            "d" (and are rewritten) once a float is read.
+            Every value is converted to the typecode, so the output has
+            the same type whether or not the input fits in memory, and
+            integers that do not fit in "q" raise OverflowError
+
+    Returns:
+        a generator of the sorted numbers if output is None, otherwise
+        the number of values written
+    """
+    assert fan_in >= 2, "fan_in must be at least 2"
+    # both inferred typecodes take 8 bytes
+    itemsize = array(typecode or "d").itemsize
+    chunk_size = max(1, memory_limit // EXTERNAL_ITEM_BYTES)
+    block_size = max(1, memory_limit // ((fan_in + 1) * itemsize))
+    if isinstance(data, str):
+        data = _read_numbers(data, typecode)
+    values = _external_sort(iter(data), chunk_size, block_size, fan_in, tmpdir, typecode)
+    if output is None:
+        return values
+    count = 0
+    with open(output, "w") as fl:
+        for value in values:
+            fl.write("%r\n" % value)
+            count += 1
+    return count
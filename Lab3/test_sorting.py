@@ -1,7 +1,13 @@
 import unittest
 
+import os
 import random
+import tempfile
 
+from sorting import binary_insertion_sort
+from sorting import bottom_up_merge_sort
+from sorting import external_sort
+from sorting import hybrid_sort
 from sorting import merge
 from sorting import merge_sort
 
@@ -68,6 +74,222 @@ class TestMergeSort(unittest.TestCase):
         self.assertListEqual(expected, merged)
 
 
+class TestBottomUpMergeSort(unittest.TestCase):
+    def test_bottom_up_merge_sort_random(self):
+        """
+        Tests bottom-up merge sort on random lists of every size up
+        to 40, so that both odd and power-of-two sizes are covered.
+        """
+        for n in range(40):
+            numbers = [random.randrange(10) for i in range(n)]
+            observed = numbers[:]
+            bottom_up_merge_sort(observed)
+            self.assertListEqual(observed, sorted(numbers))
+
+    def test_bottom_up_merge_sort_sorted(self):
+        """
+        Tests bottom-up merge sort on sorted and reversed lists.
+        """
+        numbers = sorted(random.random() for i in range(N_NUMBERS))
+        observed = numbers[:]
+        bottom_up_merge_sort(observed)
+        self.assertListEqual(observed, numbers)
+
+        observed = numbers[::-1]
+        bottom_up_merge_sort(observed)
+        self.assertListEqual(observed, numbers)
+
+    def test_bottom_up_merge_sort_strings(self):
+        """
+        Tests that non-numeric keys can be sorted.
+        """
+        words = ["pear", "apple", "fig", "banana", "cherry", "apple", "date"]
+        observed = words[:]
+        bottom_up_merge_sort(observed)
+        self.assertListEqual(observed, sorted(words))
+
+    def test_bottom_up_merge_sort_stable(self):
+        """
+        Tests that equal keys keep their order.
+        """
+        class Item:
+            def __init__(self, key, label):
+                self.key = key
+                self.label = label
+
+            def __lt__(self, other):
+                return self.key < other.key
+
+        items = [Item(random.randrange(3), i) for i in range(N_NUMBERS * 3)]
+        observed = items[:]
+        bottom_up_merge_sort(observed)
+        expected = sorted(items, key=lambda item: item.key)
+        self.assertListEqual([item.label for item in observed], [item.label for item in expected])
+
+
+class TestHybridSort(unittest.TestCase):
+    def test_binary_insertion_sort(self):
+        """
+        Tests binary insertion sort on a whole list and on a slice
+        whose start is already sorted.
+        """
+        numbers = [random.random() for i in range(N_NUMBERS)]
+        observed = numbers[:]
+        binary_insertion_sort(observed)
+        self.assertListEqual(observed, sorted(numbers))
+
+        numbers = [9, 1, 3, 5, 4, 2, 0]
+        observed = numbers[:]
+        binary_insertion_sort(observed, 1, 6, 4)
+        self.assertListEqual(observed, [9, 1, 2, 3, 4, 5, 0])
+
+    def test_hybrid_sort_random(self):
+        """
+        Tests hybrid sort on random lists that are long enough to be
+        split into several runs, with several thresholds.
+        """
+        for threshold in [2, 8, 64]:
+            for n in [0, 1, 5, 100, 1000]:
+                numbers = [random.randrange(n + 1) for i in range(n)]
+                observed = numbers[:]
+                hybrid_sort(observed, threshold)
+                self.assertListEqual(observed, sorted(numbers))
+
+    def test_hybrid_sort_runs(self):
+        """
+        Tests hybrid sort on sorted, reversed and nearly sorted lists
+        and on a list made of ascending and descending runs.
+        """
+        numbers = sorted(random.random() for i in range(1000))
+        lists = [numbers, numbers[::-1], numbers[500:] + numbers[:500]]
+        runs = []
+        for i in range(20):
+            run = sorted(random.randrange(100) for j in range(random.randrange(1, 100)))
+            runs.extend(run if i % 2 == 0 else run[::-1])
+        lists.append(runs)
+        for lst in lists:
+            observed = lst[:]
+            hybrid_sort(observed)
+            self.assertListEqual(observed, sorted(lst))
+
+    def test_hybrid_sort_stable(self):
+        """
+        Tests that equal keys keep their order, including equal keys
+        inside descending runs.
+        """
+        class Item:
+            def __init__(self, key, label):
+                self.key = key
+                self.label = label
+
+            def __lt__(self, other):
+                return self.key < other.key
+
+        keys = [random.randrange(5) for i in range(500)] + [3, 3, 2, 2, 1, 1] * 20
+        items = [Item(key, i) for i, key in enumerate(keys)]
+        observed = items[:]
+        hybrid_sort(observed, 8)
+        expected = sorted(items, key=lambda item: item.key)
+        self.assertListEqual([item.label for item in observed], [item.label for item in expected])
+
+    def test_hybrid_sort_strings(self):
+        """
+        Tests that non-numeric keys can be sorted.
+        """
+        words = [str(random.random()) for i in range(200)]
+        observed = words[:]
+        hybrid_sort(observed)
+        self.assertListEqual(observed, sorted(words))
+
+class TestExternalSort(unittest.TestCase):
+    def test_external_sort_iterator(self):
+        """
+        Tests external sort on a generator with a memory limit small
+        enough for many runs and a fan-in small enough for several
+        merge passes.
+        """
+        numbers = [random.random() for i in range(5000)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            observed = external_sort((x for x in numbers), memory_limit=4000,
+                                     fan_in=3, tmpdir=tmpdir)
+            self.assertListEqual(list(observed), sorted(numbers))
+            self.assertListEqual(os.listdir(tmpdir), [])
+
+    def test_external_sort_in_memory(self):
+        """
+        Tests that input that fits in one chunk is sorted without runs.
+        """
+        numbers = [random.randrange(100) for i in range(N_NUMBERS)]
+        observed = external_sort(numbers, typecode="q")
+        self.assertListEqual(list(observed), sorted(numbers))
+        self.assertListEqual(list(external_sort([])), [])
+
+    def test_external_sort_files(self):
+        """
+        Tests external sort from a text file to a text file, with
+        64-bit integers.
+        """
+        numbers = [random.randrange(-2 ** 40, 2 ** 40) for i in range(2000)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_flname = os.path.join(tmpdir, "input.txt")
+            output_flname = os.path.join(tmpdir, "output.txt")
+            with open(input_flname, "w") as fl:
+                for x in numbers:
+                    fl.write("%d\n" % x)
+                fl.write("\n")
+            count = external_sort(input_flname, output_flname, memory_limit=2000,
+                                  fan_in=4, typecode="q")
+            self.assertEqual(count, len(numbers))
+            with open(output_flname) as fl:
+                observed = [int(line) for line in fl]
+        self.assertListEqual(observed, sorted(numbers))
+
+    def test_external_sort_types(self):
+        """
+        Tests that the output type does not depend on whether the input
+        fits in memory, and that large integers keep their precision.
+        """
+        numbers = [2 ** 60 + i for i in range(500, 0, -1)]
+        for memory_limit in [400, 64 * 2 ** 20]:
+            observed = list(external_sort(numbers, memory_limit=memory_limit))
+            self.assertListEqual(observed, sorted(numbers))
+            self.assertTrue(all(type(x) is int for x in observed))
+            observed = list(external_sort(numbers[:10], memory_limit=memory_limit, typecode="d"))
+            self.assertTrue(all(type(x) is float for x in observed))
+        self.assertTrue(all(type(x) is float for x in external_sort([3, 1.5, 2])))
+        with self.assertRaises(OverflowError):
+            list(external_sort([2 ** 70, 1]))
+
+    def test_external_sort_mixed(self):
+        """
+        Tests input whose first chunks hold only integers and later
+        ones floats, from a list and from a text file.
+        """
+        numbers = [random.randrange(1000) for i in range(300)] + [random.random() for i in range(300)]
+        observed = list(external_sort(numbers, memory_limit=800, fan_in=3))
+        self.assertListEqual(observed, sorted(numbers))
+        self.assertTrue(all(type(x) is float for x in observed))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            input_flname = os.path.join(tmpdir, "input.txt")
+            with open(input_flname, "w") as fl:
+                for x in numbers:
+                    fl.write("%r\n" % x)
+            observed = list(external_sort(input_flname, memory_limit=800))
+        self.assertListEqual(observed, sorted(numbers))
+
+    def test_external_sort_close(self):
+        """
+        Tests that the run files are removed when the generator is
+        closed before the end.
+        """
+        numbers = [random.random() for i in range(1000)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            observed = external_sort(numbers, memory_limit=800, tmpdir=tmpdir)
+            self.assertEqual(next(observed), min(numbers))
+            self.assertEqual(len(os.listdir(tmpdir)), 1)
+            observed.close()
+            self.assertListEqual(os.listdir(tmpdir), [])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,3 +1,5 @@
+from array import array
+from itertools import islice
 import math
 
 
@@ -22,46 +24,83 @@ def _right(i):
     """
     return 2 * i + 2
 
-def _heap_increase_key(A, i, key):
+def _sift_up(A, i, d=2):
+    """
+    Moves the element at index i of a d-ary max heap up until its
+    parent is not smaller. The parents are moved down into the hole
+    left by the element instead of swapping, and the element is
+    written once at the end.
+    """
+    key = A[i]
+    while i > 0:
+        parent = (i - 1) // d
+        if not A[parent] < key:
+            break
+        A[i] = A[parent]
+        i = parent
+    A[i] = key
+
+def _sift_down(A, i, n, d=2):
+    """
+    Moves the element at index i of the d-ary max heap A[:n] down
+    until none of its children is larger, moving the largest child up
+    into the hole at every level. Binary heaps get their own loop,
+    since it runs most often and needs only one comparison per level.
+    """
+    key = A[i]
+    child = d * i + 1
+    if d == 2:
+        while child < n:
+            largest = A[child]
+            if child + 1 < n and largest < A[child + 1]:
+                child += 1
+                largest = A[child]
+            if not key < largest:
+                break
+            A[i] = largest
+            i = child
+            child = 2 * i + 1
+    else:
+        while child < n:
+            largest = A[child]
+            last = min(child + d, n)
+            c = child + 1
+            while c < last:
+                if largest < A[c]:
+                    child = c
+                    largest = A[c]
+                c += 1
+            if not key < largest:
+                break
+            A[i] = largest
+            i = child
+            child = d * i + 1
+    A[i] = key
+
+def _heap_increase_key(A, i, key, d=2):
     """
     "Bubble" a key up the heap.
     """
     assert key >= A[i], "New key is smaller than current key"
     A[i] = key
-    while i > 0 and A[_parent(i)] < A[i]:
-        temp = A[i]
-        A[i] = A[_parent(i)]
-        A[_parent(i)] = temp
-        i = _parent(i)
+    _sift_up(A, i, d)
 
-def _max_heapify(A, i, n):
+def _max_heapify(A, i, n, d=2):
     """
     Element is in the list but not yet part of the heap. This
     adds i into the heap.
     """
-    l = _left(i)
-    r = _right(i)
-    largest = i
-    if l <= n-1 and A[l] > A[i]:
-        largest = l
-    if r <= n-1 and A[r] > A[largest]:
-        largest = r
-    if largest != i:
-        temp = A[i]
-        A[i] = A[largest]
-        A[largest] = temp
-        _max_heapify(A, largest, n)
+    _sift_down(A, i, n, d)
 
-def max_heap_insert(A, key):
+def max_heap_insert(A, key, d=2):
     """
-    Inserts an element into the heap. This method
-    should append a negative infinity value to the list to make
-    room for the new key and call _heap_increase_key.
+    Inserts an element into the heap. The key is appended to the
+    list and moved up to its place, so A may also be an array.array.
     """
-    A.append(-math.inf)
-    _heap_increase_key(A, len(A)-1, key)
+    A.append(key)
+    _sift_up(A, len(A) - 1, d)
 
-def heap_extract_max(A):
+def heap_extract_max(A, d=2):
     """
     Removes the maximum value from the heap and returns it.
     The list size should be reduced by 1.
@@ -69,29 +108,364 @@ def heap_extract_max(A):
     n = len(A)
     assert n > 0, "heap underflow"
     max = A[0]
-    A[0] = A[n-1]
-    del A[n-1]
-    _max_heapify(A, 0, n-1)
+    last = A.pop()
+    if n > 1:
+        A[0] = last
+        _sift_down(A, 0, n - 1, d)
     return max
 
-def build_max_heap(A):
+def build_max_heap(A, d=2):
     """
     Takes a list A of unordered elements and reorders the elements
-    to construct a max binary heap.
+    to construct a max d-ary heap (binary by default).
     """
     n = len(A)
-    for i in range(math.floor(n/2), -1, -1):
-        _max_heapify(A, i, n)
+    for i in range((n - 2) // d, -1, -1):
+        _sift_down(A, i, n, d)
 
-def heapsort(A):
+def heapsort(A, d=2):
     """
     Sorts a list of elements by converting the list into a heap
     and then extracting each element from biggest to smallest.
     Note that this is done in place.
     """
-    build_max_heap(A)
-    for i in range(len(A)-1, 0, -1):
-        temp = A[0]
-        A[0] = A[i]
-        A[i] = temp
-        _max_heapify(A, 0, i)
+    build_max_heap(A, d)
+    for i in range(len(A) - 1, 0, -1):
+        key = A[i]
+        A[i] = A[0]
+        A[0] = key
+        _sift_down(A, 0, i, d)
+
+def partial_heapsort(A, k, d=2):
+    """
+    Like heapsort, but stops after the k largest elements have been
+    extracted, which takes O(n + k log n) time. Afterwards the k largest
+    elements are at the end of A in increasing order and the rest of
+    A is a max heap. Note that this is done in place.
+    """
+    n = len(A)
+    k = max(0, min(k, n))
+    build_max_heap(A, d)
+    for i in range(n - 1, n - k - 1, -1):
+        key = A[i]
+        A[i] = A[0]
+        A[0] = key
+        _sift_down(A, 0, i, d)
+
+def _min_sift_down(A, i, n):
+    """
+    Moves the element at index i of the binary min heap A[:n] down
+    until none of its children is smaller (the mirror of _sift_down).
+    """
+    key = A[i]
+    child = 2 * i + 1
+    while child < n:
+        smallest = A[child]
+        if child + 1 < n and A[child + 1] < smallest:
+            child += 1
+            smallest = A[child]
+        if not smallest < key:
+            break
+        A[i] = smallest
+        i = child
+        child = 2 * i + 1
+    A[i] = key
+
+def top_k(iterable, k):
+    """
+    Returns the k largest elements of iterable, largest first. The
+    elements are read one at a time and only a min heap of the k
+    largest seen so far is kept, so any iterator (a generator reading
+    a file, for example) can be processed in O(n log k) time and O(k)
+    memory. An element only enters the heap if it is larger than the
+    heap's smallest element.
+    """
+    if k <= 0:
+        return []
+    elements = iter(iterable)
+    heap = list(islice(elements, k))
+    n = len(heap)
+    for i in range((n - 2) // 2, -1, -1):
+        _min_sift_down(heap, i, n)
+    if n == k:
+        smallest = heap[0]
+        for element in elements:
+            if smallest < element:
+                heap[0] = element
+                _min_sift_down(heap, 0, k)
+                smallest = heap[0]
+    # moving the minimum to the end every time sorts in decreasing order
+    for i in range(n - 1, 0, -1):
+        key = heap[i]
+        heap[i] = heap[0]
+        heap[0] = key
+        _min_sift_down(heap, 0, i)
+    return heap
+
+def max_heap_extend(A, keys, d=2):
+    """
+    Inserts a batch of keys into the heap. A small batch is moved up
+    one key at a time, at O(log n) each in the worst case. A large
+    batch is appended and the whole heap rebuilt with build_max_heap
+    in O(n + k), which is cheaper once k log n exceeds n + k.
+    """
+    n = len(A)
+    A.extend(keys)
+    k = len(A) - n
+    if k == 0:
+        return
+    if n > 0 and k * math.log(n + k, d) <= n + k:
+        for i in range(n, n + k):
+            _sift_up(A, i, d)
+    else:
+        build_max_heap(A, d)
+
+def max_heap_pushpop(A, key, d=2):
+    """
+    Inserts key and then removes and returns the maximum, with at
+    most one sift-down. If key is at least the maximum, it is
+    returned right away and the heap is not touched.
+    """
+    if len(A) > 0 and key < A[0]:
+        max = A[0]
+        A[0] = key
+        _sift_down(A, 0, len(A), d)
+        return max
+    return key
+
+def max_heap_replace(A, key, d=2):
+    """
+    Removes and returns the maximum and then inserts key, with one
+    sift-down. Unlike max_heap_pushpop the returned value may be
+    smaller than key.
+    """
+    assert len(A) > 0, "heap underflow"
+    max = A[0]
+    A[0] = key
+    _sift_down(A, 0, len(A), d)
+    return max
+
+def max_heap_meld(A, B, d=2):
+    """
+    Returns a new heap with the keys of the heaps A and B, which are
+    left unchanged. The larger heap is copied and the smaller one
+    added with max_heap_extend, so the cost is O(len(A) + len(B)).
+    """
+    if len(A) < len(B):
+        A, B = B, A
+    C = A[:]
+    max_heap_extend(C, B, d)
+    return C
+
+
+class MaxHeap:
+    """
+    Max heap of arity d (2, 4 or 8) built on the functions above.
+
+    Keys are stored in a list, or in an array.array of the given
+    typecode, which holds numbers unboxed and packed together. Wider
+    heaps are shallower: with d = 4 a push does half as many
+    comparisons as with d = 2, but a pop compares up to d children
+    per level.
+    """
+    def __init__(self, keys=(), d=2, typecode=None):
+        """
+        Builds the heap from keys in O(n).
+        """
+        assert d >= 2, "arity must be at least 2"
+        self.d = d
+        self.data = array(typecode, keys) if typecode is not None else list(keys)
+        build_max_heap(self.data, d)
+
+    def __len__(self):
+        return len(self.data)
+
+    def push(self, key):
+        """
+        Adds a key to the heap.
+        """
+        max_heap_insert(self.data, key, self.d)
+
+    def peek(self):
+        """
+        Returns the largest key without removing it.
+        """
+        assert len(self.data) > 0, "heap underflow"
+        return self.data[0]
+
+    def pop(self):
+        """
+        Removes the largest key and returns it.
+        """
+        return heap_extract_max(self.data, self.d)
+
+    def extend(self, keys):
+        """
+        Adds a batch of keys to the heap (see max_heap_extend).
+        """
+        max_heap_extend(self.data, keys, self.d)
+
+    def pushpop(self, key):
+        """
+        Adds key, then removes and returns the largest key.
+        """
+        return max_heap_pushpop(self.data, key, self.d)
+
+    def replace(self, key):
+        """
+        Removes and returns the largest key, then adds key.
+        """
+        return max_heap_replace(self.data, key, self.d)
+
+def meld(heap_a, heap_b):
+    """
+    Returns a new MaxHeap with the keys of two MaxHeaps, with the
+    arity and storage of heap_a. Takes linear time.
+    """
+    heap = MaxHeap((), heap_a.d)
+    heap.data = heap_a.data[:]
+    max_heap_extend(heap.data, heap_b.data, heap.d)
+    return heap
+
+
+class IndexedMaxHeap:
+    """
+    Max-priority queue of distinct hashable items, each with a key.
+
+    Besides the heap of (key, item) entries, a dictionary maps every
+    item to its current index in the heap and is updated whenever an
+    entry moves, so an item can be found in O(1) and its key changed or
+    the item removed in O(log n) without searching the heap.
+    """
+    def __init__(self, entries=()):
+        """
+        Builds the heap from (item, key) pairs in O(n).
+        """
+        self._items = []
+        self._keys = []
+        self._positions = dict()
+        for item, key in entries:
+            assert item not in self._positions, "item is already in the heap"
+            self._positions[item] = len(self._items)
+            self._items.append(item)
+            self._keys.append(key)
+        for i in range(len(self._items) // 2 - 1, -1, -1):
+            self._sift_down(i)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._positions
+
+    def key(self, item):
+        """
+        Returns the key of item. Raises KeyError if item is not in the heap.
+        """
+        return self._keys[self._positions[item]]
+
+    def push(self, item, key):
+        """
+        Adds item to the heap with the given key.
+        """
+        assert item not in self._positions, "item is already in the heap"
+        self._items.append(item)
+        self._keys.append(key)
+        self._positions[item] = len(self._items) - 1
+        self._sift_up(len(self._items) - 1)
+
+    def peek(self):
+        """
+        Returns the (item, key) pair with the largest key without removing it.
+        """
+        assert len(self._items) > 0, "heap underflow"
+        return self._items[0], self._keys[0]
+
+    def pop(self):
+        """
+        Removes the item with the largest key and returns the (item, key) pair.
+        """
+        assert len(self._items) > 0, "heap underflow"
+        item = self._items[0]
+        return item, self.remove(item)
+
+    def increase_key(self, item, key):
+        """
+        Raises the key of item and moves it up the heap.
+        """
+        i = self._positions[item]
+        assert key >= self._keys[i], "New key is smaller than current key"
+        self._keys[i] = key
+        self._sift_up(i)
+
+    def decrease_key(self, item, key):
+        """
+        Lowers the key of item and moves it down the heap.
+        """
+        i = self._positions[item]
+        assert key <= self._keys[i], "New key is larger than current key"
+        self._keys[i] = key
+        self._sift_down(i)
+
+    def remove(self, item):
+        """
+        Removes item from the heap and returns its key. The last entry
+        takes its place and is moved up or down as needed.
+        """
+        i = self._positions.pop(item)
+        key = self._keys[i]
+        last_item = self._items.pop()
+        last_key = self._keys.pop()
+        if i < len(self._items):
+            self._items[i] = last_item
+            self._keys[i] = last_key
+            self._positions[last_item] = i
+            if i > 0 and self._keys[_parent(i)] < last_key:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+        return key
+
+    def _move(self, i, j):
+        """
+        Moves the entry at index i to index j and updates its position.
+        """
+        self._items[j] = self._items[i]
+        self._keys[j] = self._keys[i]
+        self._positions[self._items[j]] = j
+
+    def _sift_up(self, i):
+        """
+        Moves the entry at index i up until its parent's key is not smaller.
+        The parents are moved down into the hole instead of swapping.
+        """
+        item = self._items[i]
+        key = self._keys[i]
+        while i > 0 and self._keys[_parent(i)] < key:
+            self._move(_parent(i), i)
+            i = _parent(i)
+        self._items[i] = item
+        self._keys[i] = key
+        self._positions[item] = i
+
+    def _sift_down(self, i):
+        """
+        Moves the entry at index i down until neither child has a larger key.
+        """
+        n = len(self._items)
+        item = self._items[i]
+        key = self._keys[i]
+        while True:
+            largest = _left(i)
+            if largest >= n:
+                break
+            r = _right(i)
+            if r < n and self._keys[largest] < self._keys[r]:
+                largest = r
+            if not key < self._keys[largest]:
+                break
+            self._move(largest, i)
+            i = largest
+        self._items[i] = item
+        self._keys[i] = key
+        self._positions[item] = i
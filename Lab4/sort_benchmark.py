@@ -0,0 +1,311 @@
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Lab3"))
+
+import heap
+import sorting
+
+
+def _merge_sort(lst):
+    sorting.merge_sort(lst, 0, len(lst) - 1)
+
+def _heapq_sort(lst):
+    heapq.heapify(lst)
+    lst[:] = [heapq.heappop(lst) for _ in range(len(lst))]
+
+def _heap_insert_all(lst, d):
+    A = []
+    for key in lst:
+        heap.max_heap_insert(A, key, d)
+
+def _heap_extract_all(lst, d):
+    heap.build_max_heap(lst, d)
+    while lst:
+        heap.heap_extract_max(lst, d)
+
+def _heapq_insert_all(lst):
+    A = []
+    for key in lst:
+        heapq.heappush(A, key)
+
+def _heapq_extract_all(lst):
+    heapq.heapify(lst)
+    while lst:
+        heapq.heappop(lst)
+
+# Sorts to benchmark. Every function sorts the list it is given in place.
+SORTS = {
+    "insertion_sort": sorting.insertion_sort,
+    "merge_sort": _merge_sort,
+    "bottom_up_merge_sort": sorting.bottom_up_merge_sort,
+    "hybrid_sort": sorting.hybrid_sort,
+    "heapsort": heap.heapsort,
+    "heapsort_4ary": lambda lst: heap.heapsort(lst, 4),
+    "heapsort_8ary": lambda lst: heap.heapsort(lst, 8),
+    "heapq": _heapq_sort,
+}
+
+# Heap operations to benchmark against heapq. Every function takes a
+# list of random keys, which it may modify.
+HEAP_OPERATIONS = {
+    "build_max_heap": heap.build_max_heap,
+    "build_max_heap_4ary": lambda lst: heap.build_max_heap(lst, 4),
+    "build_max_heap_8ary": lambda lst: heap.build_max_heap(lst, 8),
+    "heapq.heapify": heapq.heapify,
+    "max_heap_insert": lambda lst: _heap_insert_all(lst, 2),
+    "max_heap_insert_4ary": lambda lst: _heap_insert_all(lst, 4),
+    "max_heap_insert_8ary": lambda lst: _heap_insert_all(lst, 8),
+    "heapq.heappush": _heapq_insert_all,
+    "heap_extract_max": lambda lst: _heap_extract_all(lst, 2),
+    "heap_extract_max_4ary": lambda lst: _heap_extract_all(lst, 4),
+    "heap_extract_max_8ary": lambda lst: _heap_extract_all(lst, 8),
+    "heapq.heappop": _heapq_extract_all,
+}
+
+# Sorts that are only run up to quadratic_limit elements.
+QUADRATIC_SORTS = set(["insertion_sort"])
+
+def _random(n, rng):
+    return [rng.random() for _ in range(n)]
+
+def _sorted(n, rng):
+    return sorted(_random(n, rng))
+
+def _reversed(n, rng):
+    return sorted(_random(n, rng), reverse=True)
+
+def _nearly_sorted(n, rng):
+    lst = _sorted(n, rng)
+    for _ in range(max(1, n // 100)):
+        i = rng.randrange(n)
+        j = rng.randrange(n)
+        lst[i], lst[j] = lst[j], lst[i]
+    return lst
+
+def _many_duplicates(n, rng):
+    return [rng.randrange(10) for _ in range(n)]
+
+def _organ_pipe(n, rng):
+    lst = _sorted(n, rng)
+    return lst[0::2] + lst[1::2][::-1]
+
+# Input generators. Each takes the size and a random.Random.
+DISTRIBUTIONS = {
+    "random": _random,
+    "sorted": _sorted,
+    "reversed": _reversed,
+    "nearly_sorted": _nearly_sorted,
+    "many_duplicates": _many_duplicates,
+    "organ_pipe": _organ_pipe,
+}
+
+# Complexity models the measurements are fitted to.
+MODELS = {
+    "n": lambda n: n,
+    "n log n": lambda n: n * math.log2(n),
+    "n^2": lambda n: n * n,
+}
+
+def time_sort(sort, lst, repeats):
+    """
+    Sorts a fresh copy of lst repeats times and returns the times.
+    Raises AssertionError if the sort gives a wrong result.
+    """
+    expected = sorted(lst)
+    times = []
+    for _ in range(repeats):
+        observed = lst[:]
+        start = time.perf_counter()
+        sort(observed)
+        times.append(time.perf_counter() - start)
+        assert observed == expected, "sort returned an unsorted list"
+    return times
+
+def time_function(func, lst, repeats):
+    """
+    Calls func on a fresh copy of lst repeats times and returns the times.
+    """
+    times = []
+    for _ in range(repeats):
+        observed = lst[:]
+        start = time.perf_counter()
+        func(observed)
+        times.append(time.perf_counter() - start)
+    return times
+
+def _result(name, distribution, n, times):
+    return {
+        "sort": name,
+        "distribution": distribution,
+        "n": n,
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "repeats": len(times),
+    }
+
+def run_benchmarks(sorts=None, distributions=None, sizes=(100, 1000, 10000),
+                   repeats=5, seed=0, quadratic_limit=10000):
+    """
+    Times every sort on every distribution and size. Returns a list of
+    dictionaries with the sort, distribution, size and the median and
+    minimum time. Quadratic sorts are skipped above quadratic_limit.
+    """
+    if sorts is None:
+        sorts = list(SORTS)
+    if distributions is None:
+        distributions = list(DISTRIBUTIONS)
+    results = []
+    for distribution in distributions:
+        for n in sizes:
+            lst = DISTRIBUTIONS[distribution](n, random.Random(seed))
+            for name in sorts:
+                if name in QUADRATIC_SORTS and n > quadratic_limit:
+                    continue
+                times = time_sort(SORTS[name], lst, repeats)
+                results.append(_result(name, distribution, n, times))
+    return results
+
+def run_heap_benchmarks(operations=None, sizes=(1000, 10000, 100000), repeats=5, seed=0):
+    """
+    Times the heap operations in HEAP_OPERATIONS on random keys. The
+    results have the same form as those of run_benchmarks, with the
+    operation in place of the sort.
+    """
+    if operations is None:
+        operations = list(HEAP_OPERATIONS)
+    results = []
+    for n in sizes:
+        lst = _random(n, random.Random(seed))
+        for name in operations:
+            times = time_function(HEAP_OPERATIONS[name], lst, repeats)
+            results.append(_result(name, "random", n, times))
+    return results
+
+def fit_complexity(sizes, times):
+    """
+    Fits t = c * f(n) for every model f in MODELS by least squares on
+    the relative error (so small and large sizes count equally) and
+    returns (model name, c, relative RMS error) of the best fit.
+    """
+    best = None
+    for name, f in MODELS.items():
+        xs = [f(n) / t for n, t in zip(sizes, times)]
+        # minimizes sum((c * x - 1)^2) with x = f(n) / t
+        c = sum(xs) / sum(x * x for x in xs)
+        error = math.sqrt(sum((c * x - 1) ** 2 for x in xs) / len(xs))
+        if best is None or error < best[2]:
+            best = (name, c, error)
+    return best
+
+def fit_results(results):
+    """
+    Fits a complexity model to the median times of every (sort,
+    distribution) pair measured at two or more sizes.
+    """
+    groups = dict()
+    for result in results:
+        groups.setdefault((result["sort"], result["distribution"]), []).append(result)
+    fits = []
+    for (name, distribution), group in groups.items():
+        if len(group) < 2:
+            continue
+        model, c, error = fit_complexity([r["n"] for r in group], [r["median_s"] for r in group])
+        fits.append({"sort": name, "distribution": distribution, "model": model,
+                     "constant": c, "relative_error": error})
+    return fits
+
+def save_results(results, flname):
+    """
+    Saves the results as CSV if flname ends with .csv, otherwise as JSON.
+    """
+    if flname.endswith(".csv"):
+        with open(flname, "w", newline="") as fl:
+            writer = csv.DictWriter(fl, fieldnames=["sort", "distribution", "n", "median_s", "min_s", "repeats"])
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(flname, "w") as fl:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.time(),
+                "results": results,
+                "fits": fit_results(results),
+            }, fl, indent=2)
+
+def load_results(flname):
+    """
+    Loads results saved by save_results.
+    """
+    if flname.endswith(".csv"):
+        with open(flname, newline="") as fl:
+            return [{"sort": row["sort"], "distribution": row["distribution"], "n": int(row["n"]),
+                     "median_s": float(row["median_s"]), "min_s": float(row["min_s"]),
+                     "repeats": int(row["repeats"])} for row in csv.DictReader(fl)]
+    with open(flname) as fl:
+        return json.load(fl)["results"]
+
+def compare_results(baseline, current, tolerance=0.1):
+    """
+    Returns (result, baseline median, current median) for every result
+    whose median time grew by more than the tolerance.
+    """
+    key = lambda result: (result["sort"], result["distribution"], result["n"])
+    baseline_medians = {key(result): result["median_s"] for result in baseline}
+    regressions = []
+    for result in current:
+        old = baseline_medians.get(key(result))
+        if old is not None and result["median_s"] > old * (1 + tolerance):
+            regressions.append((result, old, result["median_s"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Lab3 and Lab4 sorting algorithms.")
+    parser.add_argument("--sorts", nargs="+", choices=sorted(SORTS), default=None)
+    parser.add_argument("--heap", action="store_true",
+                        help="benchmark the heap operations against heapq instead of the sorts")
+    parser.add_argument("--distributions", nargs="+", choices=sorted(DISTRIBUTIONS), default=None)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quadratic-limit", type=int, default=10000,
+                        help="largest size the quadratic sorts are run on")
+    parser.add_argument("--output", help="write the results to this JSON or CSV file")
+    parser.add_argument("--baseline", help="results of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.heap:
+        results = run_heap_benchmarks(None, args.sizes, args.repeats, args.seed)
+    else:
+        results = run_benchmarks(args.sorts, args.distributions, args.sizes, args.repeats,
+                                 args.seed, args.quadratic_limit)
+    for result in results:
+        print("%-22s %-15s %8d  median %.6fs  min %.6fs" % (
+            result["sort"], result["distribution"], result["n"], result["median_s"], result["min_s"]))
+    for fit in fit_results(results):
+        print("%-22s %-15s ~ %.3g * %s (error %.2f)" % (
+            fit["sort"], fit["distribution"], fit["constant"], fit["model"], fit["relative_error"]))
+    if args.output is not None:
+        save_results(results, args.output)
+    if args.baseline is not None:
+        regressions = compare_results(load_results(args.baseline), results, args.tolerance)
+        for result, old, new in regressions:
+            print("REGRESSION %s %s %d: %.6fs -> %.6fs" % (
+                result["sort"], result["distribution"], result["n"], old, new))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
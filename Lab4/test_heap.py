@@ -1,10 +1,20 @@
 import unittest
 
+from array import array
 import random
 
 from heap import build_max_heap
 from heap import heap_extract_max
 from heap import heapsort
+from heap import IndexedMaxHeap
+from heap import MaxHeap
+from heap import max_heap_extend
+from heap import max_heap_meld
+from heap import max_heap_pushpop
+from heap import max_heap_replace
+from heap import meld
+from heap import partial_heapsort
+from heap import top_k
 from heap import max_heap_insert
 
 from heap import _left
@@ -33,6 +43,12 @@ def satisfies_heap_property(heap, i=0):
         
     
     return left_valid and right_valid and satisfies_heap_property(heap, l) and satisfies_heap_property(heap, r)
+
+def satisfies_dary_heap_property(heap, d):
+    """
+    Checks that no entry of a d-ary heap is smaller than one of its children.
+    """
+    return all(heap[(i - 1) // d] >= heap[i] for i in range(1, len(heap)))
     
 
 class TestHeap(unittest.TestCase):
@@ -104,6 +120,198 @@ class TestHeap(unittest.TestCase):
         heapsort(lst)
         
         self.assertListEqual(expected, lst)
+    def test_dary_heap(self):
+        for d in [2, 4, 8]:
+            lst = [random.random() for i in range(100)]
+            heap = lst[:]
+            build_max_heap(heap, d)
+            self.assertTrue(satisfies_dary_heap_property(heap, d))
+
+            heap = []
+            for key in lst:
+                max_heap_insert(heap, key, d)
+                self.assertTrue(satisfies_dary_heap_property(heap, d))
+            extracted = [heap_extract_max(heap, d) for i in range(len(lst))]
+            self.assertListEqual(extracted, sorted(lst, reverse=True))
+
+            heap = lst[:]
+            heapsort(heap, d)
+            self.assertListEqual(heap, sorted(lst))
+
+    def test_heapsort_array(self):
+        lst = array("q", [random.randrange(1000) for i in range(100)])
+        heapsort(lst, 4)
+        self.assertListEqual(lst.tolist(), sorted(lst.tolist()))
+
+    def test_max_heap_extend(self):
+        for d in [2, 4]:
+            for n, k in [(0, 10), (1000, 5), (1000, 2000), (10, 0)]:
+                heap = [random.random() for i in range(n)]
+                build_max_heap(heap, d)
+                keys = [random.random() for i in range(k)]
+                expected = sorted(heap + keys)
+                max_heap_extend(heap, iter(keys), d)
+                self.assertEqual(len(heap), n + k)
+                self.assertTrue(satisfies_dary_heap_property(heap, d))
+                self.assertListEqual(sorted(heap), expected)
+
+    def test_max_heap_pushpop(self):
+        heap = [7, 6, 4, 5]
+        self.assertEqual(max_heap_pushpop(heap, 8), 8)
+        self.assertListEqual(heap, [7, 6, 4, 5])
+        self.assertEqual(max_heap_pushpop(heap, 3), 7)
+        self.assertListEqual(heap, [6, 5, 4, 3])
+        self.assertEqual(max_heap_pushpop([], 1), 1)
+
+    def test_max_heap_replace(self):
+        heap = [7, 6, 4, 5]
+        self.assertEqual(max_heap_replace(heap, 8), 7)
+        self.assertListEqual(heap, [8, 6, 4, 5])
+        self.assertEqual(max_heap_replace(heap, 1), 8)
+        self.assertListEqual(heap, [6, 5, 4, 1])
+        with self.assertRaises(AssertionError):
+            max_heap_replace([], 1)
+
+    def test_max_heap_meld(self):
+        a = [random.random() for i in range(100)]
+        b = [random.random() for i in range(7)]
+        build_max_heap(a)
+        build_max_heap(b)
+        for heap in [max_heap_meld(a, b), max_heap_meld(b, a)]:
+            self.assertTrue(satisfies_heap_property(heap))
+            self.assertListEqual(sorted(heap), sorted(a + b))
+        self.assertEqual(len(a), 100)
+        self.assertEqual(len(b), 7)
+
+    def test_partial_heapsort(self):
+        for d in [2, 4]:
+            for k in [0, 1, 10, 100, 150]:
+                lst = [random.random() for i in range(100)]
+                heap = lst[:]
+                partial_heapsort(heap, k, d)
+                k = min(k, 100)
+                self.assertListEqual(heap[100 - k:], sorted(lst)[100 - k:])
+                self.assertTrue(satisfies_dary_heap_property(heap[:100 - k], d))
+
+    def test_top_k(self):
+        lst = [random.randrange(50) for i in range(1000)]
+        for k in [0, 1, 10, 1000, 2000]:
+            expected = sorted(lst, reverse=True)[:k]
+            self.assertListEqual(top_k(lst, k), expected)
+            self.assertListEqual(top_k((x for x in lst), k), expected)
+        self.assertListEqual(top_k(iter([]), 3), [])
+        self.assertListEqual(top_k(["b", "d", "a", "c"], 2), ["d", "c"])
+
+
+class TestMaxHeap(unittest.TestCase):
+    def test_push_pop(self):
+        for d in [2, 4, 8]:
+            for typecode in [None, "d"]:
+                keys = [random.random() for i in range(50)]
+                heap = MaxHeap(keys[:25], d, typecode)
+                for key in keys[25:]:
+                    heap.push(key)
+                self.assertEqual(len(heap), 50)
+                self.assertTrue(satisfies_dary_heap_property(heap.data, d))
+                self.assertEqual(heap.peek(), max(keys))
+                popped = [heap.pop() for i in range(50)]
+                self.assertListEqual(popped, sorted(keys, reverse=True))
+                with self.assertRaises(AssertionError):
+                    heap.pop()
+
+    def test_bulk_operations(self):
+        heap = MaxHeap([5, 1, 3], 4, "q")
+        heap.extend(range(10, 20))
+        self.assertEqual(len(heap), 13)
+        self.assertEqual(heap.pushpop(30), 30)
+        self.assertEqual(heap.pushpop(0), 19)
+        self.assertEqual(heap.replace(40), 18)
+        self.assertEqual(heap.peek(), 40)
+
+        other = MaxHeap([2, 50], 2)
+        melded = meld(heap, other)
+        self.assertEqual(melded.d, 4)
+        self.assertIsInstance(melded.data, array)
+        self.assertEqual(len(melded), len(heap) + 2)
+        self.assertEqual(melded.pop(), 50)
+        self.assertEqual(heap.peek(), 40)
+
+    def test_typed_array(self):
+        heap = MaxHeap([4, 5, 6, 7], 2, "i")
+        self.assertIsInstance(heap.data, array)
+        self.assertListEqual(heap.data.tolist(), [7, 5, 6, 4])
+
+
+class TestIndexedMaxHeap(unittest.TestCase):
+    def check_positions(self, heap):
+        """
+        Checks the heap property and that every item is mapped to its index.
+        """
+        self.assertTrue(satisfies_heap_property(heap._keys))
+        self.assertEqual(len(heap._positions), len(heap))
+        for i, item in enumerate(heap._items):
+            self.assertEqual(heap._positions[item], i)
+
+    def test_push_pop(self):
+        heap = IndexedMaxHeap()
+        keys = [random.random() for i in range(50)]
+        for i, key in enumerate(keys):
+            heap.push("item%d" % i, key)
+            self.check_positions(heap)
+        self.assertEqual(len(heap), 50)
+        self.assertEqual(heap.peek()[1], max(keys))
+
+        popped = []
+        while len(heap) > 0:
+            item, key = heap.pop()
+            self.assertNotIn(item, heap)
+            self.assertEqual(key, keys[int(item[4:])])
+            popped.append(key)
+            self.check_positions(heap)
+        self.assertListEqual(popped, sorted(keys, reverse=True))
+
+    def test_build(self):
+        heap = IndexedMaxHeap([("a", 4), ("b", 5), ("c", 6), ("d", 7)])
+        self.assertListEqual(heap._keys, [7, 5, 6, 4])
+        self.check_positions(heap)
+        self.assertIn("a", heap)
+        self.assertNotIn("e", heap)
+        self.assertEqual(heap.key("c"), 6)
+
+    def test_change_key(self):
+        heap = IndexedMaxHeap((i, i) for i in range(20))
+        heap.increase_key(3, 30)
+        self.check_positions(heap)
+        self.assertEqual(heap.peek(), (3, 30))
+
+        heap.decrease_key(3, -1)
+        heap.decrease_key(19, 0)
+        self.check_positions(heap)
+        self.assertEqual(heap.peek(), (18, 18))
+        self.assertEqual(heap.key(19), 0)
+
+        with self.assertRaises(AssertionError):
+            heap.increase_key(5, 4)
+        with self.assertRaises(AssertionError):
+            heap.decrease_key(5, 6)
+        with self.assertRaises(KeyError):
+            heap.increase_key(20, 30)
+
+    def test_remove(self):
+        heap = IndexedMaxHeap((i, random.random()) for i in range(30))
+        removed = random.sample(range(30), 10)
+        for item in removed:
+            key = heap.key(item)
+            self.assertEqual(heap.remove(item), key)
+            self.assertNotIn(item, heap)
+            self.check_positions(heap)
+        remaining = [heap.pop()[0] for i in range(len(heap))]
+        self.assertEqual(set(remaining), set(range(30)) - set(removed))
+
+        with self.assertRaises(AssertionError):
+            heap.pop()
+        with self.assertRaises(KeyError):
+            heap.remove(0)
 
 
 if __name__ == "__main__":
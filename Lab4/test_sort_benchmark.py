@@ -0,0 +1,67 @@
+import unittest
+
+import os
+import random
+import tempfile
+
+from sort_benchmark import compare_results
+from sort_benchmark import DISTRIBUTIONS
+from sort_benchmark import fit_complexity
+from sort_benchmark import HEAP_OPERATIONS
+from sort_benchmark import load_results
+from sort_benchmark import run_benchmarks
+from sort_benchmark import run_heap_benchmarks
+from sort_benchmark import save_results
+from sort_benchmark import SORTS
+
+class TestSortBenchmark(unittest.TestCase):
+    def test_sorts(self):
+        for distribution in DISTRIBUTIONS.values():
+            lst = distribution(50, random.Random(1))
+            self.assertEqual(len(lst), 50)
+            for sort in SORTS.values():
+                observed = lst[:]
+                sort(observed)
+                self.assertListEqual(sorted(lst), observed)
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(sizes=[10, 20], repeats=2, quadratic_limit=10)
+        # every sort except insertion_sort at both sizes
+        self.assertEqual(len(results), len(DISTRIBUTIONS) * (2 * len(SORTS) - 1))
+        for result in results:
+            self.assertGreater(result["median_s"], 0)
+            self.assertLessEqual(result["min_s"], result["median_s"])
+
+    def test_run_heap_benchmarks(self):
+        results = run_heap_benchmarks(sizes=[10, 20], repeats=1)
+        self.assertEqual(len(results), 2 * len(HEAP_OPERATIONS))
+        self.assertEqual(set(result["sort"] for result in results), set(HEAP_OPERATIONS))
+
+    def test_fit_complexity(self):
+        sizes = [100, 1000, 10000]
+        self.assertEqual(fit_complexity(sizes, [2e-9 * n * n for n in sizes])[0], "n^2")
+        model, c, error = fit_complexity(sizes, [3e-7 * n for n in sizes])
+        self.assertEqual(model, "n")
+        self.assertAlmostEqual(c, 3e-7)
+        self.assertAlmostEqual(error, 0.0)
+
+    def test_save_load(self):
+        results = run_benchmarks(sorts=["heapsort"], distributions=["random"], sizes=[10, 20], repeats=1)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for flname in ["results.json", "results.csv"]:
+                path = os.path.join(tmpdir, flname)
+                save_results(results, path)
+                self.assertListEqual(results, load_results(path))
+
+    def test_compare_results(self):
+        baseline = [{"sort": "heapsort", "distribution": "random", "n": 10, "median_s": 1.0},
+                    {"sort": "heapsort", "distribution": "random", "n": 20, "median_s": 1.0}]
+        current = [{"sort": "heapsort", "distribution": "random", "n": 10, "median_s": 1.05},
+                   {"sort": "heapsort", "distribution": "random", "n": 20, "median_s": 1.5}]
+        regressions = compare_results(baseline, current, 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0][0]["n"], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from graphs import bfs
+from graphs import DiGraph
+from graphs import load_data
+from graphs import precision
+from graphs import recall
+from graphs import recommend_all_friends
+from graphs import Vertex
+from test_graphs import generate_complete_graph
+from test_graphs import generate_linear_graph
+
+
+def generate_power_law_graph(n_vertices, m, seed=0):
+    """
+    Generates a Barabasi-Albert preferential attachment graph: each new
+    vertex connects to m existing vertices chosen with probability
+    proportional to their degree, which gives a power-law degree
+    distribution like a social network. Edges go in both directions.
+    """
+    rng = random.Random(seed)
+    g = DiGraph()
+    vertices = [Vertex(name=i) for i in range(n_vertices)]
+    # every vertex appears in `ends` once per edge it touches
+    ends = []
+    for i in range(min(m + 1, n_vertices)):
+        g.add_vertex(vertices[i])
+        for j in range(i):
+            g.add_edge(vertices[i], vertices[j])
+            g.add_edge(vertices[j], vertices[i])
+            ends.extend((i, j))
+    for i in range(m + 1, n_vertices):
+        targets = set()
+        while len(targets) < m:
+            targets.add(rng.choice(ends))
+        for j in targets:
+            g.add_edge(vertices[i], vertices[j])
+            g.add_edge(vertices[j], vertices[i])
+            ends.extend((i, j))
+    return g, vertices
+
+def generate_erdos_renyi_graph(n_vertices, p, seed=0):
+    """
+    Generates an Erdos-Renyi G(n, p) graph: every pair of vertices is
+    connected (in both directions) with probability p.
+    """
+    rng = random.Random(seed)
+    g = DiGraph()
+    vertices = [Vertex(name=i) for i in range(n_vertices)]
+    for v in vertices:
+        g.add_vertex(v)
+    for i in range(n_vertices):
+        for j in range(i + 1, n_vertices):
+            if rng.random() < p:
+                g.add_edge(vertices[i], vertices[j])
+                g.add_edge(vertices[j], vertices[i])
+    return g, vertices
+
+def generate_graph(kind, n_vertices, seed=0):
+    """
+    Generates one of the benchmark graphs by name.
+    """
+    if kind == "complete":
+        return generate_complete_graph(n_vertices)
+    if kind == "linear":
+        return generate_linear_graph(n_vertices, circular=True)
+    if kind == "power_law":
+        return generate_power_law_graph(n_vertices, 3, seed)
+    if kind == "erdos_renyi":
+        return generate_erdos_renyi_graph(n_vertices, min(1.0, 8.0 / n_vertices), seed)
+    raise ValueError("unknown graph kind %r" % kind)
+
+def _sorted_edges(G):
+    """
+    Returns the edges of G sorted by vertex name. edge_set() iterates
+    in hash order, which changes from run to run.
+    """
+    return sorted(G.edge_set(), key=lambda edge: (str(edge[0].name), str(edge[1].name)))
+
+def split_edges(G, testing_fraction, seed=0):
+    """
+    Splits the edges of G at random into a training and a testing
+    graph, like the Facebook data sets. The same graph and seed always
+    give the same split.
+    """
+    rng = random.Random(seed)
+    training_set = DiGraph()
+    testing_set = DiGraph()
+    for u, v in _sorted_edges(G):
+        if rng.random() < testing_fraction:
+            testing_set.add_edge(u, v)
+        else:
+            training_set.add_edge(u, v)
+    return training_set, testing_set
+
+def write_edges(G, flname):
+    """
+    Writes the edges of G to a TSV edge list using the vertex names,
+    sorted by name.
+    """
+    with open(flname, "w") as fl:
+        for u, v in _sorted_edges(G):
+            fl.write("%s\t%s\n" % (u.name, v.name))
+
+def measure(func, repeats):
+    """
+    Calls func() repeats times and returns the wall-clock times, plus
+    the peak memory allocated by one extra call traced with tracemalloc
+    (tracing is kept out of the timed calls because it slows them down).
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+def summarize(times, peak, n_edges):
+    """
+    Summarizes a list of times: median, 90th and 95th percentiles,
+    minimum, peak memory and edges processed per second.
+    """
+    if len(times) > 1:
+        percentiles = statistics.quantiles(times, n=20, method="inclusive")
+        p90, p95 = percentiles[17], percentiles[18]
+    else:
+        p90 = p95 = times[0]
+    median = statistics.median(times)
+    return {
+        "median_s": median,
+        "p90_s": p90,
+        "p95_s": p95,
+        "min_s": min(times),
+        "peak_bytes": peak,
+        "edges_per_s": n_edges / median if median > 0 else None,
+        "repeats": len(times),
+    }
+
+def run_suite(kinds=("linear", "power_law", "erdos_renyi"), sizes=(200, 1000),
+              depths=(1, 2, 3), repeats=5, seed=0):
+    """
+    Runs every benchmark on every graph kind and size and returns
+    a list of result dictionaries:
+     * load_data: reading the training/testing TSV files
+     * bfs: a full breadth-first search from the first vertex
+     * recommend_all_friends: once per max_depth in depths
+     * precision_recall: scoring the recommendations of every depth
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for kind in kinds:
+            for n_vertices in sizes:
+                G, vertices = generate_graph(kind, n_vertices, seed)
+                training_set, testing_set = split_edges(G, 0.1, seed)
+                training_flname = os.path.join(tmpdir, "training.tsv")
+                testing_flname = os.path.join(tmpdir, "testing.tsv")
+                write_edges(training_set, training_flname)
+                write_edges(testing_set, testing_flname)
+                n_edges = training_set.count_edges()
+
+                def record(operation, params, func, n):
+                    times, peak = measure(func, repeats)
+                    result = {
+                        "graph": kind,
+                        "n_vertices": n_vertices,
+                        "n_edges": n_edges,
+                        "operation": operation,
+                        "params": params,
+                    }
+                    result.update(summarize(times, peak, n))
+                    results.append(result)
+
+                record("load_data", {}, lambda: load_data(training_flname, testing_flname),
+                       n_edges + testing_set.count_edges())
+                record("bfs", {}, lambda: bfs(training_set, vertices[0]), n_edges)
+                recommendations = dict()
+                for max_depth in depths:
+                    recommendations[max_depth] = recommend_all_friends(training_set, max_depth)
+                    record("recommend_all_friends", {"max_depth": max_depth},
+                           lambda: recommend_all_friends(training_set, max_depth), n_edges)
+
+                def score_all():
+                    for h in recommendations.values():
+                        precision(h, testing_set)
+                        recall(h, testing_set)
+                record("precision_recall", {"depths": list(depths)}, score_all,
+                       sum(h.count_edges() for h in recommendations.values()))
+    return results
+
+def _key(result):
+    return (result["graph"], result["n_vertices"], result["operation"],
+            json.dumps(result["params"], sort_keys=True))
+
+def compare_results(baseline, current, tolerance=0.1):
+    """
+    Compares two lists of results (as returned by run_suite) and returns
+    the entries whose median time grew by more than the tolerance, as
+    (result, baseline median, current median) tuples.
+    """
+    baseline_medians = {_key(result): result["median_s"] for result in baseline}
+    regressions = []
+    for result in current:
+        old = baseline_medians.get(_key(result))
+        if old is not None and result["median_s"] > old * (1 + tolerance):
+            regressions.append((result, old, result["median_s"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Lab5 graph functions.")
+    parser.add_argument("--graphs", nargs="+", default=["linear", "power_law", "erdos_renyi"],
+                        choices=["complete", "linear", "power_law", "erdos_renyi"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[200, 1000])
+    parser.add_argument("--depths", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed slowdown of the median before reporting a regression")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.graphs, args.sizes, args.depths, args.repeats, args.seed)
+    for result in results:
+        print("%-12s %7d %-22s %-18s median %.6fs  p95 %.6fs  peak %9d B" % (
+            result["graph"], result["n_vertices"], result["operation"],
+            json.dumps(result["params"]), result["median_s"], result["p95_s"], result["peak_bytes"]))
+    if args.output is not None:
+        with open(args.output, "w") as fl:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.time(),
+                "results": results,
+            }, fl, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline) as fl:
+            baseline = json.load(fl)["results"]
+        regressions = compare_results(baseline, results, args.tolerance)
+        for result, old, new in regressions:
+            print("REGRESSION %s %d %s %s: %.6fs -> %.6fs" % (
+                result["graph"], result["n_vertices"], result["operation"],
+                json.dumps(result["params"]), old, new))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
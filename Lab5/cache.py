@@ -0,0 +1,95 @@
+from collections import namedtuple
+from collections import OrderedDict
+import threading
+import time
+
+from graphs import bfs_search
+from graphs import CSRGraph
+from graphs import recommend_friends_for_user
+
+# Hit and miss statistics of a RecommendationCache.
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "expirations",
+                                     "invalidations", "size", "maxsize"])
+
+
+def _recommend(G, s, max_depth):
+    """
+    Same result as recommend_friends_for_user, but computed without
+    writing to the Vertex attributes so concurrent lookups are safe.
+    """
+    if isinstance(G, CSRGraph):
+        return recommend_friends_for_user(G, s, max_depth)
+    d, _ = bfs_search(G, s, max_depth)
+    return [v for v in d if v is not s]
+
+class RecommendationCache:
+    """
+    LRU cache in front of recommend_friends_for_user for one graph.
+
+    Entries are keyed by (user, max_depth) and remember the version of
+    the graph they were computed from; an entry is only used while the
+    graph version (bumped by DiGraph.add_vertex/add_edge) is unchanged
+    and, if ttl is set, for at most ttl seconds. When more than maxsize
+    entries are stored, the least recently used one is evicted.
+    The cache can be shared between threads.
+    """
+    def __init__(self, G, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.graph = G
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def recommend_friends_for_user(self, s, max_depth):
+        """
+        Returns the recommendations for user s (a new list on every call),
+        computing them only if there is no current cached entry.
+        """
+        key = (s, max_depth)
+        version = self.graph.version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires, recommendations = entry
+                if entry_version != version:
+                    self.invalidations += 1
+                    del self._entries[key]
+                elif expires is not None and self._clock() >= expires:
+                    self.expirations += 1
+                    del self._entries[key]
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return list(recommendations)
+            self.misses += 1
+
+        recommendations = tuple(_recommend(self.graph, s, max_depth))
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (version, expires, recommendations)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return list(recommendations)
+
+    def info(self):
+        """
+        Returns the cache statistics as a CacheInfo tuple.
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.expirations,
+                             self.invalidations, len(self._entries), self.maxsize)
+
+    def clear(self):
+        """
+        Removes all entries. The statistics are kept.
+        """
+        with self._lock:
+            self._entries.clear()
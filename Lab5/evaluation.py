@@ -0,0 +1,102 @@
+from collections import namedtuple
+
+from graphs import CSRGraph
+from graphs import recommendation_depths
+
+# Scores of a recommendation graph against a testing set.
+Evaluation = namedtuple("Evaluation", ["true_positives", "n_recommended", "n_testing",
+                                       "precision", "recall", "f1"])
+
+
+def _neighbor_rows(G):
+    """
+    Yields (u, neighbors) for every vertex u of the DiGraph or
+    CSRGraph G, where neighbors is an iterable of Vertex objects.
+    """
+    if isinstance(G, CSRGraph):
+        vertices = G.vertices
+        for i in range(G.count_vertices()):
+            yield vertices[i], map(vertices.__getitem__, G.neighbor_ids(i))
+    else:
+        yield from G._edges.items()
+
+def count_common_edges(A, B):
+    """
+    Counts the edges that are in both A and B, each a DiGraph or a
+    CSRGraph. Only the graph with fewer edges is walked, vertex by
+    vertex: its neighbors are intersected with the adjacency set of
+    the same vertex in a DiGraph (like EdgeView.intersection_size),
+    or looked up in the sorted row of a CSRGraph.
+    """
+    if not isinstance(A, CSRGraph) and not isinstance(B, CSRGraph):
+        return A.edges().intersection_size(B.edges())
+    if B.count_edges() < A.count_edges():
+        A, B = B, A
+    size = 0
+    for u, neighbors in _neighbor_rows(A):
+        if isinstance(B, CSRGraph):
+            if B.vertex_exists(u):
+                i = B.vertex_id(u)
+                for v in neighbors:
+                    if B.vertex_exists(v) and B.has_edge_ids(i, B.vertex_id(v)):
+                        size += 1
+        else:
+            other_neighbors = B._edges.get(u)
+            if other_neighbors:
+                size += len(other_neighbors.intersection(neighbors))
+    return size
+
+def score(true_positives, n_recommended, n_testing):
+    """
+    Computes the precision, recall and F1 score from the counts.
+    """
+    p = float(true_positives) / n_recommended if n_recommended > 0 else 0.0
+    r = float(true_positives) / n_testing if n_testing > 0 else 0.0
+    f1 = 2 * p * r / (p + r) if p + r > 0 else 0.0
+    return Evaluation(true_positives, n_recommended, n_testing, p, r, f1)
+
+def evaluate_batch(recommendation_graphs, testing_set):
+    """
+    Evaluates several recommendation graphs (for example one per
+    max_depth) against the same testing set and returns a list of
+    Evaluation tuples.
+
+    The true positives are counted with count_common_edges, which only
+    walks the graph with fewer edges, so a large recommendation graph
+    costs about as much as the testing set.
+    """
+    results = []
+    for recommendations in recommendation_graphs:
+        true_positives = count_common_edges(recommendations, testing_set)
+        results.append(score(true_positives, recommendations.count_edges(), testing_set.count_edges()))
+    return results
+
+def evaluate(recommendations, testing_set):
+    """
+    Computes the precision, recall and F1 score of one recommendation graph.
+    """
+    return evaluate_batch([recommendations], testing_set)[0]
+
+def evaluate_depth_sweep(G, testing_set, max_depth):
+    """
+    Evaluates the recommendations of recommend_all_friends for every
+    depth from 1 to max_depth without building any recommendation graph.
+    The recommended edges are found with one search per user (see
+    recommendation_depths) and counted per depth; the counts for depth
+    k are the running sums up to k. Returns a list of Evaluation tuples,
+    the one at index k - 1 being for max_depth k.
+    """
+    n_new = [0] * (max_depth + 1)
+    hits = [0] * (max_depth + 1)
+    for (u, v), depth in recommendation_depths(G, max_depth).items():
+        n_new[depth] += 1
+        if testing_set.edge_exists(u, v):
+            hits[depth] += 1
+    results = []
+    n_recommended = 0
+    true_positives = 0
+    for depth in range(1, max_depth + 1):
+        n_recommended += n_new[depth]
+        true_positives += hits[depth]
+        results.append(score(true_positives, n_recommended, testing_set.count_edges()))
+    return results
@@ -0,0 +1,255 @@
+from array import array
+from collections import Counter
+from itertools import accumulate
+from itertools import chain
+from itertools import repeat
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from graphs import CSRGraph
+from graphs import DiGraph
+from graphs import Vertex
+
+# Snapshot header: magic, format version, vertex count, edge count,
+# size of the name blob in bytes, CRC-32 of everything after the header
+# and a reserved field (keeps the header, and so the arrays, 8-byte aligned).
+SNAPSHOT_MAGIC = b"CSRG"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<4sIQQQII")
+
+
+def iter_edge_batches(flname, chunk_bytes=1 << 20):
+    """
+    Memory-maps an edge list file (two integer user ids per line) and
+    yields it as a sequence of (src, dst) int arrays, one pair per chunk
+    of roughly chunk_bytes bytes. Chunks are always cut at a newline, and
+    each chunk is tokenized with a single bytes.split() call, so no str
+    objects are created per line. Peak memory is bounded by the chunk
+    size, which makes this usable on edge lists that never fit in memory.
+    """
+    with open(flname, "rb") as fl:
+        size = os.fstat(fl.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            while pos < size:
+                end = min(pos + chunk_bytes, size)
+                if end < size:
+                    nl = mm.rfind(b"\n", pos, end)
+                    if nl == -1:
+                        # a single line longer than the chunk
+                        nl = mm.find(b"\n", end)
+                    end = size if nl == -1 else nl + 1
+                ids = array("q", map(int, mm[pos:end].split()))
+                if len(ids) % 2 != 0:
+                    raise ValueError("malformed edge list: odd number of ids in %s" % flname)
+                yield ids[0::2], ids[1::2]
+                pos = end
+
+def load_edge_arrays(flname, chunk_bytes=1 << 20):
+    """
+    Loads a whole edge list file into a pair of (src, dst) int arrays.
+    """
+    src = array("q")
+    dst = array("q")
+    for batch_src, batch_dst in iter_edge_batches(flname, chunk_bytes):
+        src.extend(batch_src)
+        dst.extend(batch_dst)
+    return src, dst
+
+def csr_from_edge_batches(batches, vertex_cache=None):
+    """
+    Builds a CSRGraph from an iterable of (src, dst) id arrays, such
+    as the one returned by iter_edge_batches.
+
+    vertex_cache maps vertex names (the user ids as strings) to Vertex
+    objects. Passing the same dict for several graphs, including
+    snapshots opened with open_snapshot, makes them share Vertex
+    objects, like load_data does. Vertices are numbered in order of first appearance and
+    duplicate edges are dropped, so the result matches the DiGraph that
+    load_data would build from the same file.
+
+    The edges are kept as two int arrays of vertex ids (8 bytes per
+    edge) and grouped by source with a counting sort into a third;
+    every row is then sorted and deduplicated on its own, so apart
+    from the arrays only one row at a time is held as Python objects.
+    """
+    if vertex_cache is None:
+        vertex_cache = dict()
+    vertices = []
+    local_ids = dict()
+    src = array("i")
+    dst = array("i")
+    for batch_src, batch_dst in batches:
+        # number the new vertices in order of first appearance
+        for raw in dict.fromkeys(chain.from_iterable(zip(batch_src, batch_dst))):
+            if raw not in local_ids:
+                local_ids[raw] = len(vertices)
+                name = str(raw)
+                if name not in vertex_cache:
+                    vertex_cache[name] = Vertex(name=name)
+                vertices.append(vertex_cache[name])
+        src.extend(map(local_ids.__getitem__, batch_src))
+        dst.extend(map(local_ids.__getitem__, batch_dst))
+    del local_ids
+
+    # counting sort of the edges by source
+    n = len(vertices)
+    degrees = Counter(src)
+    starts = array("i", accumulate(map(degrees.get, range(n), repeat(0)), initial=0))
+    grouped = array("i", [0]) * len(dst)
+    positions = starts[:-1]
+    for u, v in zip(src, dst):
+        grouped[positions[u]] = v
+        positions[u] += 1
+    del src, dst, positions
+
+    offsets = array("i", [0]) * (n + 1)
+    neighbors = array("i")
+    for i in range(n):
+        row = grouped[starts[i]:starts[i + 1]]
+        neighbors.extend(sorted(set(row)))
+        offsets[i + 1] = len(neighbors)
+    del grouped
+
+    C = CSRGraph(vertices, offsets, neighbors)
+    C._ids = {v: i for i, v in enumerate(vertices)}
+    return C
+
+def load_csr(flname, vertex_cache=None, chunk_bytes=1 << 20):
+    """
+    Streams an edge list file straight into a CSRGraph.
+    """
+    return csr_from_edge_batches(iter_edge_batches(flname, chunk_bytes), vertex_cache)
+
+def load_data_csr(training_flname, testing_flname, chunk_bytes=1 << 20):
+    """
+    Version of load_data that returns a pair of CSRGraphs sharing
+    Vertex objects. It takes about as long as load_data (the work is
+    dominated by tokenizing and numbering the ids), but the graphs use
+    a few bytes per edge instead of a set entry per edge.
+    """
+    vertices = dict()
+    G1 = load_csr(training_flname, vertices, chunk_bytes)
+    G2 = load_csr(testing_flname, vertices, chunk_bytes)
+    return G1, G2
+
+
+class _SnapshotVertices:
+    """
+    Read-only sequence of the vertices stored in a snapshot. Vertex
+    objects are only created (and their names decoded) on first access.
+    If a vertex_cache dict is given, vertices are shared by name with
+    other snapshots opened with the same cache.
+    """
+    def __init__(self, name_offsets, names, vertex_cache):
+        self._name_offsets = name_offsets
+        self._names = names
+        self._vertex_cache = vertex_cache
+        self._vertices = [None] * (len(name_offsets) - 1)
+
+    def __len__(self):
+        return len(self._vertices)
+
+    def __getitem__(self, i):
+        v = self._vertices[i]
+        if v is None:
+            name = str(self._names[self._name_offsets[i]:self._name_offsets[i + 1]], "utf-8")
+            if self._vertex_cache is None:
+                v = Vertex(name=name)
+            else:
+                v = self._vertex_cache.get(name)
+                if v is None:
+                    v = self._vertex_cache[name] = Vertex(name=name)
+            self._vertices[i] = v
+        return v
+
+def _pad(size):
+    """
+    Number of zero bytes needed to align size to 8 bytes.
+    """
+    return -size % 8
+
+def save_snapshot(G, flname):
+    """
+    Saves the DiGraph or CSRGraph G to a binary snapshot file. The file
+    holds a fixed header followed by the CSR offsets and neighbors arrays
+    (int32), the name offsets (int64) and the UTF-8 vertex names, so it
+    can be opened with a memory map instead of being parsed. Vertex
+    names are stored with str(); plain (non-Vertex) vertices are stored
+    by their own str().
+    """
+    C = CSRGraph.from_digraph(G) if isinstance(G, DiGraph) else G
+    names = bytearray()
+    name_offsets = array("q", [0])
+    for v in C.vertices:
+        names += str(v.name if isinstance(v, Vertex) else v).encode("utf-8")
+        name_offsets.append(len(names))
+
+    sections = [array("i", C.offsets), array("i", C.neighbors), name_offsets]
+    if sys.byteorder != "little":
+        for section in sections:
+            section.byteswap()
+    sections.append(names)
+
+    with open(flname, "wb") as fl:
+        fl.write(bytes(_SNAPSHOT_HEADER.size))
+        crc = 0
+        for section in sections:
+            data = memoryview(section).cast("B")
+            padding = bytes(_pad(len(data)))
+            crc = zlib.crc32(padding, zlib.crc32(data, crc))
+            fl.write(data)
+            fl.write(padding)
+        fl.seek(0)
+        fl.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                       C.count_vertices(), C.count_edges(),
+                                       len(names), crc, 0))
+
+def open_snapshot(flname, vertex_cache=None, verify=False):
+    """
+    Opens a snapshot written by save_snapshot as a read-only CSRGraph.
+    The file is memory-mapped and the arrays are views into the map, so
+    opening takes constant time and processes opening the same file
+    share its pages. With verify=True the CRC-32 of the file is checked
+    as well, which reads the whole file.
+
+    Pass the same vertex_cache dict when opening several snapshots (for
+    example the training and testing sets) so they share Vertex objects.
+    """
+    with open(flname, "rb") as fl:
+        mm = mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < _SNAPSHOT_HEADER.size:
+        raise ValueError("%s is not a graph snapshot" % flname)
+    magic, version, n, m, n_names, crc, _ = _SNAPSHOT_HEADER.unpack_from(mm)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("%s is not a graph snapshot" % flname)
+    if version != SNAPSHOT_VERSION:
+        raise ValueError("unsupported snapshot version %d" % version)
+    if verify and zlib.crc32(mm[_SNAPSHOT_HEADER.size:]) != crc:
+        raise ValueError("snapshot checksum mismatch in %s" % flname)
+
+    layout = []
+    pos = _SNAPSHOT_HEADER.size
+    for typecode, count in (("i", n + 1), ("i", m), ("q", n + 1)):
+        size = struct.calcsize(typecode) * count
+        layout.append((typecode, pos, size))
+        pos += size + _pad(size)
+    if pos + n_names > len(mm):
+        raise ValueError("truncated snapshot %s" % flname)
+
+    buf = memoryview(mm)
+    sections = []
+    for typecode, start, size in layout:
+        section = buf[start:start + size].cast(typecode)
+        if sys.byteorder != "little":
+            section = array(typecode, section)
+            section.byteswap()
+        sections.append(section)
+    offsets, neighbors, name_offsets = sections
+    names = buf[pos:pos + n_names]
+    return CSRGraph(_SnapshotVertices(name_offsets, names, vertex_cache), offsets, neighbors)
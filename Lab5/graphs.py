@@ -1,6 +1,15 @@
+from array import array
+from bisect import bisect_left
 from collections import deque
+from collections.abc import Set
 import copy
+import heapq
+import math
+from multiprocessing import Pool
+from multiprocessing import shared_memory
+import os
 import sys
+import weakref
 
 
 class DiGraph:
@@ -10,6 +19,8 @@ class DiGraph:
     """
     def __init__(self):
         self._edges = {}
+        self._n_edges = 0
+        self._version = 0
     
     """
     Adds a new vertex to the graph.
@@ -17,19 +28,30 @@ class DiGraph:
     def add_vertex(self, v):
         if not self.vertex_exists(v):
             self._edges[v] = set()
+            self._version += 1
     
     """
     Adds and edge to the directed graph. U is the starting vertex. V is the ending vertex.
     """
     def add_edge(self, u, v):
-        if self.vertex_exists(u):
-            self._edges[u].add(v)
-        else:
+        if not self.vertex_exists(u):
             self.add_vertex(u)
+        if v not in self._edges[u]:
             self._edges[u].add(v)
+            self._n_edges += 1
+            self._version += 1
         if not self.vertex_exists(v):
             self.add_vertex(v)
     
+    """
+    Removes the edge from U to V if it exists. Both vertices stay in the graph.
+    """
+    def remove_edge(self, u, v):
+        if self.edge_exists(u, v):
+            self._edges[u].remove(v)
+            self._n_edges -= 1
+            self._version += 1
+    
     """
     Checks if a vertex exists in the graph.
     """
@@ -45,10 +67,17 @@ class DiGraph:
         return len(self._edges.keys())
     
     """
-    Returns the number of edges in the graph
+    Returns a counter that changes every time a vertex or edge is added or removed,
+    so cached results computed from the graph can be checked for staleness.
+    """
+    def version(self):
+        return self._version
+    
+    """
+    Returns the number of edges in the graph. The count is kept up to date by add_edge.
     """
     def count_edges(self):
-        return len(self.edge_set())
+        return self._n_edges
     
     """
     Return whether or not an edge exists
@@ -76,21 +105,322 @@ class DiGraph:
             for connected_vertex in self._edges[vertex]:
                 edge_set.add((vertex, connected_vertex))
         return edge_set
+    
+    """
+    Returns a lazy, set-like view of the edges as (u, v) tuples. Unlike edge_set,
+    nothing is copied; tuples are only created when the view is iterated.
+    """
+    def edges(self):
+        return EdgeView(self)
+
+
+class EdgeView(Set):
+    """
+    Read-only, set-like view of the edges of a DiGraph. Supports len,
+    membership tests of (u, v) tuples and iteration without building
+    a set of tuples. intersection_size counts the edges two views have
+    in common by intersecting the adjacency sets vertex by vertex.
+    """
+    def __init__(self, G):
+        self._graph = G
+
+    def __len__(self):
+        return self._graph.count_edges()
+
+    def __contains__(self, edge):
+        if not isinstance(edge, tuple) or len(edge) != 2:
+            return False
+        u, v = edge
+        return self._graph.edge_exists(u, v)
+
+    def __iter__(self):
+        for u, neighbors in self._graph._edges.items():
+            for v in neighbors:
+                yield (u, v)
+
+    @classmethod
+    def _from_iterable(cls, it):
+        # results of the Set operators (&, |, -) are plain sets of tuples
+        return set(it)
+
+    def intersection_size(self, other):
+        """
+        Returns the number of edges in both this view and other.
+        """
+        edges = self._graph._edges
+        other_edges = other._graph._edges
+        if len(other_edges) < len(edges):
+            edges, other_edges = other_edges, edges
+        size = 0
+        for u, neighbors in edges.items():
+            other_neighbors = other_edges.get(u)
+            if other_neighbors:
+                size += len(neighbors.intersection(other_neighbors))
+        return size
+
+    def intersection(self, other):
+        """
+        Returns the edges in both this view and other as a set of tuples.
+        """
+        return self & other
         
 
+# Vertex colors used by the breadth-first searches. Every Vertex refers
+# to one of these three shared strings.
+WHITE = "WHITE"
+GRAY = "GRAY"
+BLACK = "BLACK"
+
+
 class Vertex:
     """
     Models vertices in a graph.  The pi, color, and d attributes
     are used to store information as part of a breadth-first search.
     The name attribute is used for a unique identifier for each
     vertex.
+
+    Vertex uses __slots__, so instances have no per-instance __dict__.
     """
-    def __init__(self, pi=None, color="WHITE", d=sys.maxsize, name=None):
+    __slots__ = ("pi", "color", "d", "name")
+
+    def __init__(self, pi=None, color=WHITE, d=sys.maxsize, name=None):
         self.pi = pi
         self.color = color
         self.d = d
         self.name = name
 
+
+class VertexTable:
+    """
+    Struct-of-arrays version of the Vertex search attributes for the
+    n vertices of a CSRGraph. Entry i of each array belongs to the vertex
+    with id i: color holds an index into COLORS (one byte), d the depth
+    (sys.maxsize if unreached) and pi the parent id (-1 for none).
+    """
+    COLORS = (WHITE, GRAY, BLACK)
+    WHITE_ID = 0
+    GRAY_ID = 1
+    BLACK_ID = 2
+
+    def __init__(self, n):
+        self.color = array("b", [self.WHITE_ID]) * n
+        self.d = array("q", [sys.maxsize]) * n
+        self.pi = array("i", [-1]) * n
+
+    def __len__(self):
+        return len(self.color)
+
+    def reset(self):
+        """
+        Marks every vertex as WHITE and unreached.
+        """
+        n = len(self)
+        self.color[:] = array("b", [self.WHITE_ID]) * n
+        self.d[:] = array("q", [sys.maxsize]) * n
+        self.pi[:] = array("i", [-1]) * n
+
+    def color_name(self, i):
+        """
+        Returns the color of vertex i as one of WHITE, GRAY and BLACK.
+        """
+        return self.COLORS[self.color[i]]
+
+
+class CSRGraph:
+    """
+    Frozen compressed sparse row (CSR) representation of a DiGraph.
+    Vertices are mapped to dense integer ids 0..n-1 (in the order
+    they appear in the source graph). The neighbors of vertex i are
+    stored, sorted by id, in neighbors[offsets[i]:offsets[i + 1]].
+    Both arrays are int32 arrays, so a graph costs 4 bytes per edge
+    plus 4 bytes per vertex rather than a Python set entry per edge.
+    """
+    def __init__(self, vertices, offsets, neighbors):
+        self.vertices = vertices
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self._ids = None
+        self._row_masks = None
+        self._column_masks = None
+        self._in_degrees = None
+
+    @classmethod
+    def from_digraph(cls, G):
+        """
+        Builds a CSRGraph from the DiGraph G. The vertex objects
+        of G are kept so results can be mapped back to them.
+        """
+        vertices = list(G._edges.keys())
+        ids = {v: i for i, v in enumerate(vertices)}
+        offsets = array("i", [0])
+        neighbors = array("i")
+        for v in vertices:
+            neighbors.extend(sorted(ids[w] for w in G._edges[v]))
+            offsets.append(len(neighbors))
+        C = cls(vertices, offsets, neighbors)
+        C._ids = ids
+        return C
+
+    def _vertex_ids(self):
+        """
+        Returns the vertex -> id map, building it on first use.
+        """
+        if self._ids is None:
+            self._ids = {v: i for i, v in enumerate(self.vertices)}
+        return self._ids
+
+    def vertex_id(self, v):
+        """
+        Returns the dense integer id of vertex v.
+        """
+        return self._vertex_ids()[v]
+
+    def vertex_exists(self, v):
+        """
+        Checks if a vertex exists in the graph.
+        """
+        return v in self._vertex_ids()
+
+    def count_vertices(self):
+        """
+        Returns the number of vertices in the graph
+        """
+        return len(self.offsets) - 1
+
+    def count_edges(self):
+        """
+        Returns the number of edges in the graph
+        """
+        return len(self.neighbors)
+
+    def version(self):
+        """
+        CSRGraphs never change, so the version is always 0.
+        """
+        return 0
+
+    def neighbor_ids(self, i):
+        """
+        Returns the ids of the vertices adjacent to the vertex with id i.
+        """
+        return self.neighbors[self.offsets[i]:self.offsets[i + 1]]
+
+    def has_edge_ids(self, i, j):
+        """
+        Return whether or not an edge exists between the vertices
+        with ids i and j. Uses a binary search over the sorted row.
+        """
+        hi = self.offsets[i + 1]
+        k = bisect_left(self.neighbors, j, self.offsets[i], hi)
+        return k < hi and self.neighbors[k] == j
+
+    def edge_exists(self, u, v):
+        """
+        Return whether or not an edge exists
+        """
+        if not self.vertex_exists(u) or not self.vertex_exists(v):
+            return False
+        return self.has_edge_ids(self.vertex_id(u), self.vertex_id(v))
+
+    def get_outgoing_edges(self, v):
+        """
+        Returns all the edges outgoing from vertex v
+        """
+        if not self.vertex_exists(v):
+            return set()
+        vertices = self.vertices
+        return {vertices[j] for j in self.neighbor_ids(self.vertex_id(v))}
+
+    def to_digraph(self):
+        """
+        Converts the CSRGraph back into a (mutable) DiGraph.
+        """
+        G = DiGraph()
+        vertices = self.vertices
+        for i in range(self.count_vertices()):
+            u = vertices[i]
+            G.add_vertex(u)
+            for j in self.neighbor_ids(i):
+                G.add_edge(u, vertices[j])
+        return G
+
+    def row_masks(self):
+        """
+        Returns the adjacency matrix as one int bitset per vertex:
+        bit j of row_masks()[i] is set if there is an edge i -> j.
+        Built on first use; this costs O(V^2 / 8) bytes on dense graphs.
+        """
+        if self._row_masks is None:
+            n = self.count_vertices()
+            self._row_masks = [_bitset(self.neighbor_ids(i), n) for i in range(n)]
+        return self._row_masks
+
+    def in_degrees(self):
+        """
+        Returns an int array whose entry j is the number of edges into
+        vertex j. Built on first use.
+        """
+        if self._in_degrees is None:
+            in_degrees = array("i", [0]) * self.count_vertices()
+            for j in self.neighbors:
+                in_degrees[j] += 1
+            self._in_degrees = in_degrees
+        return self._in_degrees
+
+    def column_masks(self):
+        """
+        Returns the transposed adjacency matrix as int bitsets:
+        bit i of column_masks()[j] is set if there is an edge i -> j.
+        """
+        if self._column_masks is None:
+            n = self.count_vertices()
+            columns = [[] for _ in range(n)]
+            for i in range(n):
+                for j in self.neighbor_ids(i):
+                    columns[j].append(i)
+            self._column_masks = [_bitset(column, n) for column in columns]
+        return self._column_masks
+
+# CSRGraphs built by as_csr, with the version of the DiGraph they were built from
+_csr_cache = weakref.WeakKeyDictionary()
+
+def as_csr(G):
+    """
+    Returns G if it is a CSRGraph, otherwise a CSRGraph of the DiGraph G.
+    The CSRGraph is kept (for as long as G exists) and reused until G
+    is modified, so per-user queries do not pay O(E) for the conversion
+    every time.
+    """
+    if isinstance(G, CSRGraph):
+        return G
+    entry = _csr_cache.get(G)
+    if entry is None or entry[0] != G.version():
+        entry = (G.version(), CSRGraph.from_digraph(G))
+        _csr_cache[G] = entry
+    return entry[1]
+
+def _bitset(ids, n):
+    """
+    Returns an int with the bits at the positions in ids set.
+    n is the number of vertices (an upper bound on the ids).
+    """
+    bits = bytearray((n + 7) // 8)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
+
+def _bit_indices(x):
+    """
+    Returns the positions of the set bits of the int x, in increasing order.
+    """
+    bits = format(x, "b")[::-1]
+    indices = []
+    i = bits.find("1")
+    while i != -1:
+        indices.append(i)
+        i = bits.find("1", i + 1)
+    return indices
+
 def load_data(training_flname, testing_flname):
     """
     Loads the training and testing set data. Returns
@@ -133,28 +463,191 @@ def precision(recommendations, testing_set):
 
     A precise algorithm rarely makes false positive predictions.
     """
-    rec_edges = recommendations.edge_set()
-    test_edges = testing_set.edge_set()
-    intersection = rec_edges.intersection(test_edges)
+    rec_edges = recommendations.edges()
+    test_edges = testing_set.edges()
     
     if len(rec_edges) == 0:
         return 0.0
     
-    return float(len(intersection)) / len(rec_edges)
+    return float(rec_edges.intersection_size(test_edges)) / len(rec_edges)
     
 def recall(recommendations, testing_set):
     """
     Recall measures the fraction of test set that
     were predicted positively.
     """
-    rec_edges = recommendations.edge_set()
-    test_edges = testing_set.edge_set()
-    intersection = rec_edges.intersection(test_edges)
+    rec_edges = recommendations.edges()
+    test_edges = testing_set.edges()
     
     if len(test_edges) == 0:
         return 0.0
     
-    return float(len(intersection)) / len(test_edges)
+    return float(rec_edges.intersection_size(test_edges)) / len(test_edges)
+
+def _csr_bfs(C, s, max_depth=-1, table=None):
+    """
+    Breadth-first search over the CSRGraph C from the vertex with id s.
+    Vertices at depth max_depth are not expanded (max_depth < 0 means
+    no limit) and stay GRAY. The state is written to the VertexTable
+    table (a new one if None, otherwise it is reset first), which is
+    returned.
+    """
+    offsets = C.offsets
+    neighbors = C.neighbors
+    if table is None:
+        table = VertexTable(C.count_vertices())
+    else:
+        table.reset()
+    color = table.color
+    d = table.d
+    pi = table.pi
+    white = VertexTable.WHITE_ID
+    gray = VertexTable.GRAY_ID
+    black = VertexTable.BLACK_ID
+    color[s] = gray
+    d[s] = 0
+    frontier = [s]
+    depth = 0
+    while frontier and depth != max_depth:
+        depth += 1
+        next_frontier = []
+        for u in frontier:
+            for v in neighbors[offsets[u]:offsets[u + 1]]:
+                if color[v] == white:
+                    color[v] = gray
+                    d[v] = depth
+                    pi[v] = u
+                    next_frontier.append(v)
+            color[u] = black
+        frontier = next_frontier
+    return table
+
+def _csr_depth_limited(C, s, max_depth, d):
+    """
+    Depth-limited breadth-first search over the CSRGraph C from the
+    vertex with id s. Returns the ids of all vertices found with
+    1 <= depth <= max_depth, in discovery order.
+
+    d is a scratch int array of length C.count_vertices() filled with -1.
+    Only the entries that are touched get reset before returning, so
+    the same array can be reused for every source without an O(V) reset.
+    """
+    offsets = C.offsets
+    neighbors = C.neighbors
+    d[s] = 0
+    found = []
+    frontier = [s]
+    depth = 0
+    while frontier and depth < max_depth:
+        depth += 1
+        next_frontier = []
+        for u in frontier:
+            for v in neighbors[offsets[u]:offsets[u + 1]]:
+                if d[v] == -1:
+                    d[v] = depth
+                    next_frontier.append(v)
+        found.extend(next_frontier)
+        frontier = next_frontier
+    d[s] = -1
+    for v in found:
+        d[v] = -1
+    return found
+
+def bitset_bfs(C, s, max_depth=None, alpha=14, beta=24):
+    """
+    Direction-optimizing breadth-first search over the CSRGraph C from
+    the vertex with id s, with the frontier and visited sets stored as
+    int bitsets. Returns a list of bitsets: bit v of levels[k] is set if
+    vertex v is at depth k. Vertices at depth max_depth are not expanded.
+
+    Each level is expanded in one of two ways:
+     * top-down: OR together the adjacency rows of the frontier vertices
+       and AND-NOT the visited set;
+     * bottom-up: every unvisited vertex checks whether its column of
+       the adjacency matrix intersects the frontier.
+    Following Beamer et al., the search switches to bottom-up when the
+    edges leaving the frontier exceed 1/alpha of the edges leaving the
+    unexplored vertices, and back to top-down when the frontier holds
+    fewer than 1/beta of the vertices. Both steps are bulk operations on
+    machine words, which pays off on dense, small-diameter graphs.
+    """
+    n = C.count_vertices()
+    offsets = C.offsets
+    rows = C.row_masks()
+    everything = (1 << n) - 1
+    frontier = 1 << s
+    frontier_ids = [s]
+    visited = frontier
+    levels = [frontier]
+    m_frontier = offsets[s + 1] - offsets[s]
+    m_unexplored = C.count_edges() - m_frontier
+    bottom_up = False
+    depth = 0
+    while frontier and depth != max_depth:
+        if bottom_up:
+            bottom_up = len(frontier_ids) * beta >= n
+        else:
+            bottom_up = m_frontier * alpha > m_unexplored
+        if bottom_up:
+            columns = C.column_masks()
+            frontier = _bitset([v for v in _bit_indices(everything & ~visited)
+                                if columns[v] & frontier], n)
+        else:
+            next_frontier = 0
+            for u in frontier_ids:
+                next_frontier |= rows[u]
+            frontier = next_frontier & ~visited
+        if not frontier:
+            break
+        visited |= frontier
+        levels.append(frontier)
+        frontier_ids = _bit_indices(frontier)
+        m_frontier = sum(offsets[i + 1] - offsets[i] for i in frontier_ids)
+        m_unexplored -= m_frontier
+        depth += 1
+    return levels
+
+def bfs_search(G, s, max_depth=None):
+    """
+    Performs a breadth-first search of the DiGraph G, starting at vertex s,
+    without touching the Vertex attributes. Vertices at depth max_depth
+    or more are not expanded (None means no limit), so a negative
+    max_depth only visits s.
+
+    The search state lives in two dictionaries that are created for this
+    call only, so the cost is proportional to the part of the graph that
+    is visited and several searches can run on the same graph at once.
+    Returns the pair (d, pi): d maps every visited vertex to its depth and
+    pi maps it to its parent (None for s). Both are in discovery order.
+    """
+    d = {s: 0}
+    pi = {s: None}
+    q = deque([s])
+    while len(q) != 0:
+        u = q.popleft()
+        depth = d[u]
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for v in G.get_outgoing_edges(u):
+            if v not in d:
+                d[v] = depth + 1
+                pi[v] = u
+                q.append(v)
+    return d, pi
+
+def _store_bfs_state(G, d, pi):
+    """
+    Copies the result of bfs_search onto the Vertex attributes of G:
+    visited vertices are BLACK, every other vertex is reset to WHITE.
+    """
+    for u in G._edges.keys():
+        u.color = WHITE
+        u.d = sys.maxsize
+        u.pi = None
+    for v, depth in d.items():
+        v.color = BLACK
+        v.d = depth
+        v.pi = pi[v]
 
 def bfs(G, s):
     """
@@ -166,24 +659,17 @@ def bfs(G, s):
        use q.append() to add the back of the queue, q.popleft() to remove
        items from the front of the queue, and len(q) to check if the queue
        is empty (len(q) == 0).
+
+    The search itself is done by bfs_search; this wrapper stores the
+    results in the color, d and pi attributes of the vertices.
+
+    If G is a CSRGraph the search runs on its arrays instead of the
+    Vertex attributes, and the results are returned as a VertexTable.
     """
-    for u in G._edges.keys():
-        u.color = "WHITE"
-        u.d = sys.maxsize
-        u.pi = None
-    s.color = "GRAY"
-    s.d = 0
-    s.pi = None
-    q = deque([s])
-    while len(q) != 0:
-        u = q.popleft()
-        for v in G.get_outgoing_edges(u):
-            if v.color is "WHITE":
-                v.color = "GRAY"
-                v.d = u.d + 1
-                v.pi = u
-                q.append(v)
-        u.color = "BLACK"
+    if isinstance(G, CSRGraph):
+        return _csr_bfs(G, G.vertex_id(s))
+    d, pi = bfs_search(G, s)
+    _store_bfs_state(G, d, pi)
           
 def recommend_friends_for_user(G, s, max_depth):
     """
@@ -197,41 +683,465 @@ def recommend_friends_for_user(G, s, max_depth):
        use q.append() to add the back of the queue, q.popleft() to remove
        items from the front of the queue, and len(q) to check if the queue
        is empty (len(q) == 0).
+
+    The search itself is done by bfs_search; this wrapper stores the
+    results in the vertex attributes. As in a plain BFS, the vertices one
+    step past max_depth are discovered (GRAY) but not traversed.
+
+    If G is a CSRGraph the search runs on its arrays and the Vertex
+    attributes are left untouched.
     """
-    for u in G._edges.keys():
-        u.color = "WHITE"
-        u.d = sys.maxsize
-        u.pi = None
-    s.color = "GRAY"
-    s.d = 0
-    s.pi = None
-    q = deque([s])
-    recommended = []
-    while len(q) != 0:
-        u = q.popleft()
-        for v in G.get_outgoing_edges(u):
-            if v.color is "WHITE":
-                v.color = "GRAY"
-                v.d = u.d + 1
-                v.pi = u
-                if v.d <= max_depth:
-                    q.append(v)
-                    recommended.append(v)
-        u.color = "BLACK"
-    return recommended
-    
+    if isinstance(G, CSRGraph):
+        d = array("i", [-1]) * G.count_vertices()
+        vertices = G.vertices
+        return [vertices[i] for i in _csr_depth_limited(G, G.vertex_id(s), max_depth, d)]
+    d, pi = bfs_search(G, s, max_depth)
+    _store_bfs_state(G, d, pi)
+    for u, depth in d.items():
+        if depth >= max_depth:
+            for v in G.get_outgoing_edges(u):
+                if v.color == WHITE:
+                    v.color = GRAY
+                    v.d = depth + 1
+                    v.pi = u
+    return [v for v in d if v is not s]
+
 def recommend_all_friends(G, max_depth):
     """
     Generates recommendations for all users by performing
     a depth-limited breadth-first search for each user.
     
     The resulting recommendations are stored as a DiGraph.
+    G may also be a CSRGraph, in which case the searches run on its
+    arrays and share a single scratch distance array.
     """
+    if isinstance(G, CSRGraph):
+        return _csr_recommend_all_friends(G, max_depth)
     h = DiGraph()
     for u in G._edges.keys():
-        targets = recommend_friends_for_user(G, u, max_depth)
-        for v in targets:
-            if not G.edge_exists(v, u):
+        d, _ = bfs_search(G, u, max_depth)
+        for v in d:
+            if v is not u and not G.edge_exists(v, u):
                 h.add_edge(u, v)
                 h.add_edge(v, u)
     return h
+
+
+def _csr_recommend_all_friends(C, max_depth):
+    """
+    recommend_all_friends for a CSRGraph. Produces the same
+    DiGraph of recommendations as the DiGraph version.
+    """
+    h = DiGraph()
+    vertices = C.vertices
+    d = array("i", [-1]) * C.count_vertices()
+    for u in range(C.count_vertices()):
+        for v in _csr_depth_limited(C, u, max_depth, d):
+            if not C.has_edge_ids(v, u):
+                h.add_edge(vertices[u], vertices[v])
+                h.add_edge(vertices[v], vertices[u])
+    return h
+
+
+def _digraph_from_rows(vertices, rows):
+    """
+    Builds a DiGraph from sets of vertex ids: row i holds the ids that
+    vertex i has edges to. Vertices with empty rows are left out.
+    """
+    h = DiGraph()
+    for i, row in enumerate(rows):
+        if row:
+            h._edges[vertices[i]] = set(map(vertices.__getitem__, row))
+            h._n_edges += len(row)
+    h._version = len(h._edges) + h._n_edges
+    return h
+
+def recommend_all_friends_msbfs(G, max_depth, batch_size=256):
+    """
+    Multi-source version of recommend_all_friends. The users are processed
+    in batches of batch_size sources that are searched together: every
+    vertex keeps one int word whose bit k says whether source k of the
+    batch has already reached it, so each adjacency row is scanned once
+    per level for the whole batch instead of once per source.
+
+    The words live in lists indexed by vertex id that are cleared after
+    every batch (only the touched entries), and a word per vertex that
+    links back to the sources replaces the edge lookup of the mutual-edge
+    filter. The recommendations are gathered as sets of ids and turned
+    into a DiGraph at the end.
+
+    G may be a DiGraph or a CSRGraph. The same mutual-edge filtering as
+    recommend_all_friends is applied and the resulting DiGraph has the
+    same edges.
+    """
+    C = G if isinstance(G, CSRGraph) else CSRGraph.from_digraph(G)
+    offsets = C.offsets
+    neighbors = C.neighbors
+    n = C.count_vertices()
+    in_rows = [[] for _ in range(n)]
+    for u in range(n):
+        for w in neighbors[offsets[u]:offsets[u + 1]]:
+            in_rows[w].append(u)
+    rows = [set() for _ in range(n)]
+    # bit k of seen[w] / reached[w]: source k has found / just reached w
+    seen = [0] * n
+    reached = [0] * n
+    for first in range(0, n, batch_size):
+        sources = range(first, min(first + batch_size, n))
+        # bit k of linked[w]: w has an edge to source k
+        linked = dict()
+        frontier = []
+        touched = []
+        for k, s in enumerate(sources):
+            bit = 1 << k
+            seen[s] = bit
+            touched.append(s)
+            frontier.append((s, bit))
+            for w in in_rows[s]:
+                linked[w] = linked.get(w, 0) | bit
+        depth = 0
+        while frontier and depth < max_depth:
+            depth += 1
+            order = []
+            for v, bits in frontier:
+                for w in neighbors[offsets[v]:offsets[v + 1]]:
+                    x = reached[w]
+                    if not x:
+                        order.append(w)
+                    reached[w] = x | bits
+            frontier = []
+            for w in order:
+                old = seen[w]
+                bits = reached[w] & ~old
+                reached[w] = 0
+                if bits:
+                    if not old:
+                        touched.append(w)
+                    seen[w] = old | bits
+                    frontier.append((w, bits))
+                    bits &= ~linked.get(w, 0)
+                    row = rows[w]
+                    while bits:
+                        low = bits & -bits
+                        u = first + low.bit_length() - 1
+                        bits ^= low
+                        rows[u].add(w)
+                        row.add(u)
+        for w in touched:
+            seen[w] = 0
+    return _digraph_from_rows(C.vertices, rows)
+
+
+def score_candidates(C, s, score="common_neighbors"):
+    """
+    Scores the friends-of-friends of the vertex with id s in the
+    CSRGraph C. Candidates are the vertices two steps away that are not
+    s and not already connected to s in either direction. Returns a
+    dictionary mapping candidate ids to their score, which is one of:
+     * "common_neighbors": |N(s) & In(v)|, the number of paths s -> w -> v
+     * "jaccard": |N(s) & In(v)| / |N(s) | In(v)|
+     * "adamic_adar": the sum of 1 / log(|N(w)|) over the common
+       neighbors w (degrees below 2 are counted as 2)
+    where N(v) is the set of vertices v has an edge to and In(v) the
+    set of vertices with an edge to v (the two are the same in an
+    undirected graph). The common neighbors are counted by walking the
+    sparse rows of s's neighbors, so only the two-step neighborhood of
+    s is touched.
+    """
+    if score not in ("common_neighbors", "jaccard", "adamic_adar"):
+        raise ValueError("unknown score %r" % score)
+    offsets = C.offsets
+    neighbors = C.neighbors
+    row = neighbors[offsets[s]:offsets[s + 1]]
+    friends = set(row)
+    scores = dict()
+    for w in row:
+        start = offsets[w]
+        end = offsets[w + 1]
+        if score == "adamic_adar":
+            weight = 1.0 / math.log(max(end - start, 2))
+        else:
+            weight = 1
+        for v in neighbors[start:end]:
+            if v != s and v not in friends:
+                scores[v] = scores.get(v, 0) + weight
+    for v in list(scores):
+        if C.has_edge_ids(v, s):
+            del scores[v]
+    if score == "jaccard":
+        degree = len(row)
+        in_degrees = C.in_degrees()
+        for v, common in scores.items():
+            union = degree + in_degrees[v] - common
+            scores[v] = common / union if union > 0 else 0.0
+    return scores
+
+def _top_k(scores, k):
+    """
+    Selects the k (id, score) pairs with the highest scores using a
+    bounded min-heap of size k, breaking ties by the smaller id.
+    Returns them from best to worst.
+    """
+    if k <= 0:
+        return []
+    heap = []
+    for v, value in scores.items():
+        entry = (value, -v)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    heap.sort(reverse=True)
+    return [(-v, value) for value, v in heap]
+
+def top_k_friends_for_user(G, s, k, score="adamic_adar"):
+    """
+    Recommends at most k friends for the user s, ranked by score (see
+    score_candidates). G may be a DiGraph or a CSRGraph; the CSRGraph
+    of a DiGraph is built once and reused (see as_csr). Returns a list
+    of (vertex, score) pairs from best to worst.
+    """
+    C = as_csr(G)
+    vertices = C.vertices
+    return [(vertices[v], value) for v, value in _top_k(score_candidates(C, C.vertex_id(s), score), k)]
+
+def recommend_top_k_friends(G, k, score="adamic_adar"):
+    """
+    Generates at most k ranked recommendations for every user. Only
+    k candidates per user are kept at any time, so memory is O(V * k)
+    rather than proportional to the size of the neighborhoods.
+
+    The recommendations are stored as a DiGraph with both directions
+    of every recommended edge, like recommend_all_friends.
+    """
+    C = G if isinstance(G, CSRGraph) else CSRGraph.from_digraph(G)
+    vertices = C.vertices
+    h = DiGraph()
+    for u in range(C.count_vertices()):
+        for v, _ in _top_k(score_candidates(C, u, score), k):
+            h.add_edge(vertices[u], vertices[v])
+            h.add_edge(vertices[v], vertices[u])
+    return h
+
+
+def recommendation_depths(G, max_depth):
+    """
+    Runs one depth-limited breadth-first search per user, up to
+    max_depth, and records for every recommended edge the smallest
+    max_depth at which recommend_all_friends would produce it.
+
+    Returns a dictionary mapping (u, v) edge tuples to that depth.
+    Both directions of a recommendation are included, like in the
+    DiGraph that recommend_all_friends returns.
+    """
+    depths = dict()
+    for u in G._edges.keys():
+        d, _ = bfs_search(G, u, max_depth)
+        for v, depth in d.items():
+            if v is not u and not G.edge_exists(v, u):
+                for edge in ((u, v), (v, u)):
+                    if depths.get(edge, sys.maxsize) > depth:
+                        depths[edge] = depth
+    return depths
+
+def recommend_all_friends_by_depth(G, max_depth):
+    """
+    Computes the recommendations for every depth from 1 to max_depth
+    with a single pass of searches (see recommendation_depths) instead
+    of one recommend_all_friends call per depth.
+
+    Returns a list of DiGraphs; the graph at index k - 1 is equal to
+    recommend_all_friends(G, k).
+    """
+    graphs = [DiGraph() for _ in range(max_depth)]
+    for (u, v), depth in recommendation_depths(G, max_depth).items():
+        for h in graphs[depth - 1:]:
+            h.add_edge(u, v)
+    return graphs
+
+
+class IncrementalRecommender:
+    """
+    Keeps the result of recommend_all_friends(G, max_depth) up to date
+    while edges are added to the DiGraph G through add_edge. When the
+    edge u -> v is added, only the users within max_depth - 1 steps of u
+    (whose searches can now go through the new edge) and v (whose
+    mutual-edge filter changes) are searched again, so the cost of an
+    update depends on the local neighborhood rather than the whole graph.
+
+    If a testing set is given, the number of recommended edges found
+    in it is maintained as well, so precision and recall are O(1).
+    Edges must be added through this class (not G.add_edge directly)
+    for the recommendations to stay current.
+    """
+    def __init__(self, G, max_depth, testing_set=None):
+        self.graph = G
+        self.max_depth = max_depth
+        self.testing_set = testing_set
+        self.recommendations = DiGraph()
+        self.true_positives = 0
+        # recommended targets found by the search from each user
+        self._targets = dict()
+        # incoming edges of every vertex, for searching backwards from u
+        self._reverse = dict()
+        for u, neighbors in G._edges.items():
+            self._reverse.setdefault(u, set())
+            for v in neighbors:
+                self._reverse.setdefault(v, set()).add(u)
+        for u in list(G._edges.keys()):
+            self._update_source(u)
+
+    def add_edge(self, u, v):
+        """
+        Adds the edge u -> v to the graph and updates the recommendations.
+        """
+        if self.graph.edge_exists(u, v):
+            return
+        self.graph.add_edge(u, v)
+        self._reverse.setdefault(u, set())
+        self._reverse.setdefault(v, set()).add(u)
+        affected = self._sources_near(u, self.max_depth - 1)
+        affected.add(v)
+        for s in affected:
+            self._update_source(s)
+
+    def precision(self):
+        """
+        Precision of the current recommendations on the testing set.
+        """
+        if self.recommendations.count_edges() == 0:
+            return 0.0
+        return float(self.true_positives) / self.recommendations.count_edges()
+
+    def recall(self):
+        """
+        Recall of the current recommendations on the testing set.
+        """
+        if self.testing_set is None or self.testing_set.count_edges() == 0:
+            return 0.0
+        return float(self.true_positives) / self.testing_set.count_edges()
+
+    def _sources_near(self, u, depth):
+        """
+        Returns the set of vertices that reach u in at most depth steps,
+        found with a breadth-first search over the incoming edges.
+        """
+        if depth < 0:
+            return set()
+        found = {u}
+        frontier = [u]
+        for _ in range(depth):
+            next_frontier = []
+            for w in frontier:
+                for s in self._reverse[w]:
+                    if s not in found:
+                        found.add(s)
+                        next_frontier.append(s)
+            frontier = next_frontier
+        return found
+
+    def _update_source(self, s):
+        """
+        Searches again from s and applies the difference between the
+        new and old targets to the recommendation graph. An edge is only
+        removed when the search from the other end no longer produces it.
+        """
+        G = self.graph
+        d, _ = bfs_search(G, s, self.max_depth)
+        targets = set(v for v in d if v is not s and not G.edge_exists(v, s))
+        old_targets = self._targets.get(s, set())
+        self._targets[s] = targets
+        for t in targets - old_targets:
+            self._add_recommendation(s, t)
+            self._add_recommendation(t, s)
+        for t in old_targets - targets:
+            if s not in self._targets.get(t, ()):
+                self._remove_recommendation(s, t)
+                self._remove_recommendation(t, s)
+
+    def _add_recommendation(self, u, v):
+        if not self.recommendations.edge_exists(u, v):
+            self.recommendations.add_edge(u, v)
+            if self.testing_set is not None and self.testing_set.edge_exists(u, v):
+                self.true_positives += 1
+
+    def _remove_recommendation(self, u, v):
+        if self.recommendations.edge_exists(u, v):
+            self.recommendations.remove_edge(u, v)
+            if self.testing_set is not None and self.testing_set.edge_exists(u, v):
+                self.true_positives -= 1
+
+
+# Read-only CSR view of the shared graph inside a pool worker.
+_worker_graph = None
+_worker_shm = None
+
+def _init_recommend_worker(shm_name, n_vertices, n_edges):
+    """
+    Pool initializer. Attaches to the shared memory block holding
+    the offsets and neighbors arrays and wraps them in a CSRGraph.
+    Nothing is copied; every worker reads the same pages.
+    """
+    global _worker_graph, _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    split = 4 * (n_vertices + 1)
+    offsets = _worker_shm.buf[:split].cast("i")
+    neighbors = _worker_shm.buf[split:split + 4 * n_edges].cast("i")
+    _worker_graph = CSRGraph(None, offsets, neighbors)
+
+def _recommend_chunk(task):
+    """
+    Runs the depth-limited search for the source ids in [start, stop)
+    on the worker's shared graph. Returns the recommended (u, v) id
+    pairs flattened into an int array, which pickles compactly.
+    """
+    start, stop, max_depth = task
+    C = _worker_graph
+    d = array("i", [-1]) * C.count_vertices()
+    pairs = array("i")
+    for u in range(start, stop):
+        for v in _csr_depth_limited(C, u, max_depth, d):
+            if not C.has_edge_ids(v, u):
+                pairs.append(u)
+                pairs.append(v)
+    return pairs
+
+def recommend_all_friends_parallel(G, max_depth, processes=None, chunksize=None):
+    """
+    Parallel version of recommend_all_friends. The source vertices
+    are split into contiguous chunks that are searched by a pool of
+    processes. The graph (a DiGraph or CSRGraph) is converted to CSR
+    form and placed in shared memory once, so workers share it
+    read-only instead of receiving a pickled copy per task.
+
+    The per-chunk results are merged in source order, so the returned
+    DiGraph is identical to the one recommend_all_friends builds.
+    """
+    C = G if isinstance(G, CSRGraph) else CSRGraph.from_digraph(G)
+    n = C.count_vertices()
+    m = C.count_edges()
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, n // (processes * 8))
+    tasks = [(start, min(start + chunksize, n), max_depth)
+             for start in range(0, n, chunksize)]
+
+    split = 4 * (n + 1)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, split + 4 * m))
+    try:
+        shm.buf[:split] = memoryview(array("i", C.offsets)).cast("B")
+        shm.buf[split:split + 4 * m] = memoryview(array("i", C.neighbors)).cast("B")
+        h = DiGraph()
+        vertices = C.vertices
+        with Pool(processes, _init_recommend_worker, (shm.name, n, m)) as pool:
+            for pairs in pool.imap(_recommend_chunk, tasks):
+                for k in range(0, len(pairs), 2):
+                    u = vertices[pairs[k]]
+                    v = vertices[pairs[k + 1]]
+                    h.add_edge(u, v)
+                    h.add_edge(v, u)
+    finally:
+        shm.close()
+        shm.unlink()
+    return h
@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from cache import RecommendationCache
+from graphs import CSRGraph
+from graphs import load_data
+
+
+class RecommendationService:
+    """
+    asyncio front-end that serves recommend_friends_for_user for one graph.
+
+    Requests that arrive within batch_window seconds of each other (up
+    to max_batch of them) are coalesced into one micro-batch. Duplicate
+    (user, max_depth) requests in a batch are computed once, and each
+    batch runs on a pool of worker threads through a RecommendationCache.
+    At most `workers` batches are in flight at a time, which bounds the
+    queueing delay under load.
+
+    Users are looked up by the str() of their Vertex name. Requests for
+    a max_depth above max_depth_limit are rejected, since the cost of a
+    search grows with the depth.
+    """
+    def __init__(self, G, max_depth=2, batch_window=0.002, max_batch=64,
+                 workers=4, cache_size=4096, cache_ttl=None, max_depth_limit=4):
+        self.graph = G
+        self.max_depth = max_depth
+        self.max_depth_limit = max_depth_limit
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.workers = workers
+        self.cache = RecommendationCache(G, cache_size, cache_ttl)
+        self.batches = 0
+        self._users = dict()
+        for v in (G.vertices if isinstance(G, CSRGraph) else G._edges.keys()):
+            self._users[str(v.name)] = v
+        self._queue = None
+        self._batcher = None
+        self._slots = None
+        self._executor = None
+        self._running = set()
+        self._collecting = []
+
+    async def start(self):
+        """
+        Starts the batching task. Called by serve_unix/serve_tcp.
+        """
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._executor = ThreadPoolExecutor(self.workers)
+            self._batcher = asyncio.create_task(self._collect_batches())
+
+    async def close(self):
+        """
+        Stops the batching task and the worker pool. Requests that have
+        not been handed to a worker yet fail with RuntimeError; batches
+        already running are finished first.
+        """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+            pending = self._collecting
+            self._collecting = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(RuntimeError("the service was closed"))
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+            executor = self._executor
+            self._executor = None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def recommend(self, user, max_depth=None):
+        """
+        Returns the names of the users recommended for the user named
+        `user`. Raises KeyError for unknown users and ValueError if
+        max_depth is negative or above max_depth_limit.
+        """
+        if user not in self._users:
+            raise KeyError(user)
+        if max_depth is None:
+            max_depth = self.max_depth
+        if not 0 <= max_depth <= self.max_depth_limit:
+            raise ValueError("max_depth must be between 0 and %d" % self.max_depth_limit)
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((user, max_depth), future))
+        return await future
+
+    async def _collect_batches(self):
+        """
+        Takes requests off the queue and groups them into batches.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            # kept on the service so close() can fail a partial batch
+            batch = self._collecting = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._collecting = []
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch):
+        """
+        Computes one batch on the worker pool and resolves its futures.
+        """
+        try:
+            keys = list(dict.fromkeys(key for key, _ in batch))
+            self.batches += 1
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._executor, self._compute, keys)
+            for key, future in batch:
+                if not future.done():
+                    future.set_result(results[key])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _compute(self, keys):
+        """
+        Runs in a worker thread. Returns a dictionary mapping each
+        (user, max_depth) key to the list of recommended user names.
+        """
+        results = dict()
+        for user, max_depth in keys:
+            recommendations = self.cache.recommend_friends_for_user(self._users[user], max_depth)
+            results[(user, max_depth)] = [str(v.name) for v in recommendations]
+        return results
+
+    async def _respond(self, line, writer, write_lock):
+        """
+        Answers one request line with one JSON line.
+        """
+        response = dict()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict) or "user" not in request:
+                raise ValueError("expected an object with a user field")
+            if "id" in request:
+                response["id"] = request["id"]
+            response["user"] = str(request["user"])
+            response["max_depth"] = int(request.get("max_depth", self.max_depth))
+            response["recommendations"] = await self.recommend(response["user"], response["max_depth"])
+        except KeyError:
+            response["error"] = "unknown user %s" % response["user"]
+        except (ValueError, TypeError, OverflowError) as e:
+            response["error"] = "bad request: %s" % e
+        async with write_lock:
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        """
+        Serves one connection. Every line is a JSON object such as
+        {"user": "2719", "max_depth": 2, "id": 7}; max_depth and id are
+        optional. Requests on a connection are answered concurrently, so
+        responses may come back out of order; the id is echoed to match them.
+        """
+        write_lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._respond(line, writer, write_lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            # the client went away; drop its outstanding responses
+            for task in pending:
+                task.cancel()
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path):
+        """
+        Starts serving on a Unix domain socket and returns the asyncio server.
+        """
+        await self.start()
+        return await asyncio.start_unix_server(self.handle_client, path=path)
+
+    async def serve_tcp(self, host="127.0.0.1", port=8765):
+        """
+        Starts serving on a TCP port and returns the asyncio server.
+        """
+        await self.start()
+        return await asyncio.start_server(self.handle_client, host, port)
+
+async def _serve(args):
+    training_set, _ = load_data(args.training, args.testing)
+    service = RecommendationService(training_set, args.max_depth, args.batch_window,
+                                    args.max_batch, args.workers, args.cache_size, args.cache_ttl,
+                                    args.max_depth_limit)
+    if args.socket is not None:
+        server = await service.serve_unix(args.socket)
+    else:
+        server = await service.serve_tcp(args.host, args.port)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve friend recommendations over a line protocol.")
+    parser.add_argument("training", help="training set edge list (TSV)")
+    parser.add_argument("testing", help="testing set edge list (TSV)")
+    parser.add_argument("--socket", help="Unix socket path (default: serve over TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-depth", type=int, default=2)
+    parser.add_argument("--max-depth-limit", type=int, default=4, help="largest max_depth a request may ask for")
+    parser.add_argument("--batch-window", type=float, default=0.002, help="seconds to wait for a batch to fill")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4, help="worker threads / batches in flight")
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--cache-ttl", type=float, default=None)
+    asyncio.run(_serve(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
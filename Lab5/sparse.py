@@ -0,0 +1,213 @@
+from array import array
+
+from graphs import CSRGraph
+from graphs import _digraph_from_rows
+from graphs import DiGraph
+
+
+def to_scipy_csr(G):
+    """
+    Exports the adjacency matrix of the DiGraph or CSRGraph G as a
+    scipy.sparse.csr_matrix. Row and column i correspond to vertex
+    CSRGraph.vertices[i]. Requires numpy and scipy, which are only
+    imported when this function is called.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    C = G if isinstance(G, CSRGraph) else CSRGraph.from_digraph(G)
+    n = C.count_vertices()
+    indptr = np.frombuffer(array("i", C.offsets), dtype=np.int32)
+    indices = np.frombuffer(array("i", C.neighbors), dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.int32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(n, n))
+
+def _scipy_adjacency(C):
+    """
+    Returns the adjacency matrix of C from to_scipy_csr, or None if
+    numpy or scipy is not installed.
+    """
+    try:
+        return to_scipy_csr(C)
+    except ImportError:
+        return None
+
+def _matrix_rows(M, block):
+    """
+    Yields (u, indices, values) for the rows of the csr_matrix M, which
+    holds the rows of the vertex ids in block.
+    """
+    indptr = M.indptr.tolist()
+    indices = M.indices.tolist()
+    data = M.data.tolist()
+    for i, u in enumerate(block):
+        yield u, indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]
+
+def multiply_rows(C, rows):
+    """
+    Multiplies sparse row vectors by the adjacency matrix A of the
+    CSRGraph C (row-by-row, Gustavson's algorithm). Each row is a
+    dictionary mapping column ids to values; the products are
+    returned in the same form.
+    """
+    offsets = C.offsets
+    neighbors = C.neighbors
+    products = []
+    for row in rows:
+        product = dict()
+        for w, x in row.items():
+            for v in neighbors[offsets[w]:offsets[w + 1]]:
+                product[v] = product.get(v, 0) + x
+        products.append(product)
+    return products
+
+def _row_blocks(C, block_size):
+    """
+    Splits the vertex ids of C into ranges of at most block_size rows.
+    """
+    n = C.count_vertices()
+    return [range(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+
+def common_neighbor_counts(C, block_size=1024):
+    """
+    Computes A^2 for the CSRGraph C one block of rows at a time.
+    Entry (u, v) of A^2 is the number of vertices w with edges
+    u -> w -> v, i.e. the common-neighbor count of u and v.
+
+    Yields (u, row) pairs where row maps v to the count. At most
+    block_size rows are held in memory at once. When scipy is installed
+    every block is one sparse product A[block] @ A; otherwise the rows
+    are multiplied in Python by multiply_rows.
+    """
+    A = _scipy_adjacency(C)
+    for block in _row_blocks(C, block_size):
+        if A is None:
+            rows = [dict.fromkeys(C.neighbor_ids(u), 1) for u in block]
+            yield from zip(block, multiply_rows(C, rows))
+        else:
+            product = A[block.start:block.stop] @ A
+            for u, indices, values in _matrix_rows(product, block):
+                yield u, dict(zip(indices, values))
+
+def _reachability_block(A, block, max_depth):
+    """
+    Returns the rows of the vertex ids in block of A + A^2 + ... +
+    A^max_depth as a 0/1 csr_matrix (with the diagonal) computed with
+    sparse products on the csr_matrix A.
+    """
+    reached = A[block.start:block.stop]
+    frontier = reached
+    for _ in range(max_depth - 1):
+        # the new entries of this power: F_(k+1) = (F_k @ A) and not R_k
+        frontier = frontier @ A
+        frontier.data[:] = 1
+        frontier = frontier - frontier.multiply(reached)
+        frontier.eliminate_zeros()
+        if frontier.nnz == 0:
+            break
+        reached = reached + frontier
+    return reached
+
+def _reachability_scipy(A, block, max_depth):
+    """
+    Returns the reachability rows of the vertex ids in block (see
+    reachability) computed with sparse products on the csr_matrix A.
+    """
+    rows = []
+    for u, indices, values in _matrix_rows(_reachability_block(A, block, max_depth), block):
+        row = set(indices)
+        row.discard(u)
+        rows.append(row)
+    return rows
+
+def reachability(C, max_depth, block_size=1024):
+    """
+    Computes the depth-limited reachability matrix of the CSRGraph C,
+    R = A + A^2 + ... + A^max_depth (as a boolean matrix, without the
+    diagonal), one block of rows at a time.
+
+    When scipy is installed only the new entries of every power are
+    multiplied, with one sparse product per block and depth:
+    F_1 = A[block], F_(k+1) = (F_k @ A) and not R_k. Without scipy the
+    same frontiers are expanded in Python, one set per row, which does
+    the work of a BFS from every vertex and is no faster than
+    recommend_all_friends.
+
+    Yields (u, reached) pairs where reached is the set of vertex ids
+    at distance 1 to max_depth from u.
+    """
+    A = _scipy_adjacency(C) if max_depth > 0 else None
+    offsets = C.offsets
+    neighbors = C.neighbors
+    for block in _row_blocks(C, block_size):
+        if A is not None:
+            yield from zip(block, _reachability_scipy(A, block, max_depth))
+            continue
+        reached = [{u} for u in block]
+        frontiers = [{u} for u in block]
+        for _ in range(max_depth):
+            active = False
+            for i, frontier in enumerate(frontiers):
+                if frontier:
+                    step = set()
+                    for w in frontier:
+                        step.update(neighbors[offsets[w]:offsets[w + 1]])
+                    step -= reached[i]
+                    reached[i] |= step
+                    frontiers[i] = step
+                    active = active or len(step) > 0
+            if not active:
+                break
+        for u, row in zip(block, reached):
+            row.discard(u)
+            yield u, row
+
+def _recommendation_matrix(A, max_depth, block_size):
+    """
+    Returns the symmetric csr_matrix of the recommendations of
+    recommend_all_friends_sparse: the pairs (u, v) with v reachable from
+    u within max_depth steps and no edge v -> u, in both directions.
+    """
+    from scipy import sparse
+
+    n = A.shape[0]
+    transposed = A.T.tocsr()
+    blocks = []
+    for start in range(0, n, block_size):
+        block = range(start, min(start + block_size, n))
+        reached = _reachability_block(A, block, max_depth)
+        # drop u itself and the v with an edge v -> u
+        excluded = transposed[block.start:block.stop] + sparse.eye(len(block), n, k=start, format="csr")
+        blocks.append(reached - reached.multiply(excluded.astype(bool)))
+    recommendations = sparse.vstack(blocks, format="csr")
+    recommendations.eliminate_zeros()
+    return (recommendations + recommendations.T).tocsr()
+
+def recommend_all_friends_sparse(G, max_depth, block_size=1024):
+    """
+    Version of recommend_all_friends that is computed from the depth-limited
+    reachability matrix (see reachability) in blocks of block_size rows.
+    G may be a DiGraph or a CSRGraph. Returns the same DiGraph of
+    recommendations as recommend_all_friends.
+
+    When scipy is installed the mutual-edge filter and the
+    symmetrization are sparse operations too, and the DiGraph is built
+    once from the rows of the result; otherwise every pair is checked
+    in Python, which is no faster than recommend_all_friends.
+    """
+    C = G if isinstance(G, CSRGraph) else CSRGraph.from_digraph(G)
+    A = _scipy_adjacency(C) if max_depth > 0 else None
+    if A is not None:
+        M = _recommendation_matrix(A, max_depth, block_size)
+        indptr = M.indptr.tolist()
+        indices = M.indices.tolist()
+        rows = [indices[indptr[i]:indptr[i + 1]] for i in range(M.shape[0])]
+        return _digraph_from_rows(C.vertices, rows)
+    vertices = C.vertices
+    h = DiGraph()
+    for u, reached in reachability(C, max_depth, block_size):
+        for v in reached:
+            if not C.has_edge_ids(v, u):
+                h.add_edge(vertices[u], vertices[v])
+                h.add_edge(vertices[v], vertices[u])
+    return h
@@ -0,0 +1,92 @@
+import unittest
+
+import json
+import os
+import tempfile
+
+from benchmark import compare_results
+from benchmark import generate_erdos_renyi_graph
+from benchmark import generate_power_law_graph
+from benchmark import main
+from benchmark import run_suite
+from benchmark import split_edges
+from benchmark import write_edges
+
+class TestGenerators(unittest.TestCase):
+    def test_power_law(self):
+        g, vertices = generate_power_law_graph(50, 2, seed=1)
+        h, _ = generate_power_law_graph(50, 2, seed=1)
+        
+        self.assertEqual(g.count_vertices(), 50)
+        # 3 edges in the seed clique, then m per new vertex, in both directions
+        self.assertEqual(g.count_edges(), 2 * (3 + 2 * 47))
+        self.assertSetEqual(set((u.name, v.name) for u, v in g.edge_set()),
+                            set((u.name, v.name) for u, v in h.edge_set()))
+        
+    def test_erdos_renyi(self):
+        g, vertices = generate_erdos_renyi_graph(30, 0.2, seed=4)
+        
+        self.assertEqual(g.count_vertices(), 30)
+        for u, v in g.edge_set():
+            self.assertTrue(g.edge_exists(v, u))
+        self.assertEqual(generate_erdos_renyi_graph(30, 0.0)[0].count_edges(), 0)
+
+    def test_split_edges(self):
+        """
+        The split depends only on the seed, not on the hash order of
+        the (separately created) vertices.
+        """
+        names = lambda h: set((u.name, v.name) for u, v in h.edge_set())
+        g, _ = generate_power_law_graph(40, 2, seed=2)
+        h, _ = generate_power_law_graph(40, 2, seed=2)
+        
+        training_g, testing_g = split_edges(g, 0.3, seed=5)
+        training_h, testing_h = split_edges(h, 0.3, seed=5)
+        
+        self.assertEqual(training_g.count_edges() + testing_g.count_edges(), g.count_edges())
+        self.assertSetEqual(names(training_g), names(training_h))
+        self.assertSetEqual(names(testing_g), names(testing_h))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_edges(g, os.path.join(tmpdir, "g.tsv"))
+            write_edges(h, os.path.join(tmpdir, "h.tsv"))
+            with open(os.path.join(tmpdir, "g.tsv")) as fl_g, open(os.path.join(tmpdir, "h.tsv")) as fl_h:
+                self.assertEqual(fl_g.read(), fl_h.read())
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_suite(self):
+        results = run_suite(kinds=["complete", "power_law"], sizes=[12], depths=[1, 2], repeats=2)
+        
+        operations = [result["operation"] for result in results]
+        self.assertEqual(len(results), 2 * 5)
+        self.assertEqual(operations.count("recommend_all_friends"), 4)
+        for result in results:
+            self.assertGreaterEqual(result["p95_s"], result["min_s"])
+            self.assertGreater(result["peak_bytes"], 0)
+        json.dumps(results)
+        
+    def test_compare_results(self):
+        baseline = run_suite(kinds=["linear"], sizes=[10], depths=[1], repeats=1)
+        current = json.loads(json.dumps(baseline))
+        current[0]["median_s"] = baseline[0]["median_s"] * 2 + 1
+        
+        regressions = compare_results(baseline, current)
+        
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0][0]["operation"], baseline[0]["operation"])
+        self.assertListEqual(compare_results(baseline, baseline), [])
+        
+    def test_main_output(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            flname = os.path.join(tmpdir, "results.json")
+            status = main(["--graphs", "linear", "--sizes", "10", "--depths", "1",
+                           "--repeats", "1", "--output", flname])
+            
+            self.assertEqual(status, 0)
+            with open(flname) as fl:
+                data = json.load(fl)
+            self.assertIn("python", data)
+            self.assertEqual(len(data["results"]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
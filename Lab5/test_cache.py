@@ -0,0 +1,99 @@
+import unittest
+
+from cache import RecommendationCache
+from graphs import CSRGraph
+from graphs import recommend_friends_for_user
+from test_graphs import generate_linear_graph
+
+class FakeClock:
+    """
+    Clock that only moves when told to.
+    """
+    def __init__(self):
+        self.now = 0.0
+        
+    def __call__(self):
+        return self.now
+
+class TestRecommendationCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        g, vertices = generate_linear_graph(6, circular=False)
+        cache = RecommendationCache(g)
+        
+        first = cache.recommend_friends_for_user(vertices[0], 2)
+        second = cache.recommend_friends_for_user(vertices[0], 2)
+        cache.recommend_friends_for_user(vertices[0], 3)
+        
+        self.assertListEqual(first, vertices[1:3])
+        self.assertListEqual(second, first)
+        self.assertListEqual(first, recommend_friends_for_user(g, vertices[0], 2))
+        info = cache.info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.size, 2)
+        
+        # callers get their own copy
+        second.append("x")
+        self.assertListEqual(cache.recommend_friends_for_user(vertices[0], 2), vertices[1:3])
+        
+    def test_lru_eviction(self):
+        g, vertices = generate_linear_graph(6, circular=False)
+        cache = RecommendationCache(g, maxsize=2)
+        
+        cache.recommend_friends_for_user(vertices[0], 1)
+        cache.recommend_friends_for_user(vertices[1], 1)
+        # touch vertices[0] so vertices[1] is the least recently used
+        cache.recommend_friends_for_user(vertices[0], 1)
+        cache.recommend_friends_for_user(vertices[2], 1)
+        
+        info = cache.info()
+        self.assertEqual(info.evictions, 1)
+        self.assertEqual(info.size, 2)
+        cache.recommend_friends_for_user(vertices[0], 1)
+        self.assertEqual(cache.info().hits, 2)
+        cache.recommend_friends_for_user(vertices[1], 1)
+        self.assertEqual(cache.info().misses, 4)
+        
+    def test_ttl(self):
+        g, vertices = generate_linear_graph(6, circular=False)
+        clock = FakeClock()
+        cache = RecommendationCache(g, ttl=10, clock=clock)
+        
+        cache.recommend_friends_for_user(vertices[0], 1)
+        clock.now = 9.0
+        cache.recommend_friends_for_user(vertices[0], 1)
+        clock.now = 10.0
+        cache.recommend_friends_for_user(vertices[0], 1)
+        
+        info = cache.info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.expirations, 1)
+        self.assertEqual(info.misses, 2)
+        
+    def test_invalidation(self):
+        g, vertices = generate_linear_graph(6, circular=False)
+        cache = RecommendationCache(g)
+        
+        self.assertListEqual(cache.recommend_friends_for_user(vertices[0], 1), [vertices[1]])
+        g.add_edge(vertices[0], vertices[5])
+        recommendations = cache.recommend_friends_for_user(vertices[0], 1)
+        
+        self.assertSetEqual(set(recommendations), set([vertices[1], vertices[5]]))
+        self.assertEqual(cache.info().invalidations, 1)
+        
+        # re-adding an existing edge does not change the version
+        g.add_edge(vertices[0], vertices[5])
+        cache.recommend_friends_for_user(vertices[0], 1)
+        self.assertEqual(cache.info().hits, 1)
+        
+    def test_csr_graph(self):
+        g, vertices = generate_linear_graph(6, circular=False)
+        cache = RecommendationCache(CSRGraph.from_digraph(g))
+        
+        self.assertListEqual(cache.recommend_friends_for_user(vertices[0], 2), vertices[1:3])
+        self.assertListEqual(cache.recommend_friends_for_user(vertices[0], 2), vertices[1:3])
+        self.assertEqual(cache.info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
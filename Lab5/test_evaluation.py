@@ -0,0 +1,91 @@
+import unittest
+
+from evaluation import count_common_edges
+from evaluation import evaluate
+from evaluation import evaluate_batch
+from evaluation import evaluate_depth_sweep
+from graphs import CSRGraph
+from graphs import DiGraph
+from graphs import precision
+from graphs import recall
+from graphs import recommend_all_friends
+from test_graphs import generate_linear_graph
+
+class TestEvaluation(unittest.TestCase):
+    def test_evaluate(self):
+        recommendations = DiGraph()
+        recommendations.add_edge("a", "b")
+        recommendations.add_edge("a", "c")
+        recommendations.add_edge("b", "c")
+        recommendations.add_edge("c", "a")
+        
+        testing_set = DiGraph()
+        testing_set.add_edge("a", "b")
+        testing_set.add_edge("c", "a")
+        testing_set.add_edge("d", "a")
+        
+        result = evaluate(recommendations, testing_set)
+        self.assertEqual(result.true_positives, 2)
+        self.assertAlmostEqual(result.precision, 0.5)
+        self.assertAlmostEqual(result.recall, 2.0 / 3.0)
+        self.assertAlmostEqual(result.f1, 4.0 / 7.0)
+        
+        result = evaluate(DiGraph(), testing_set)
+        self.assertEqual(result.precision, 0.0)
+        self.assertEqual(result.f1, 0.0)
+        
+    def test_evaluate_batch(self):
+        """
+        The batch results agree with precision and recall.
+        """
+        g, vertices = generate_linear_graph(12, circular=True)
+        testing_set = DiGraph()
+        for i in range(12):
+            testing_set.add_edge(vertices[i], vertices[(i + 3) % 12])
+            testing_set.add_edge(vertices[i], vertices[(i + 5) % 12])
+        
+        recommendations = [recommend_all_friends(g, max_depth) for max_depth in range(1, 7)]
+        results = evaluate_batch(recommendations, testing_set)
+        
+        self.assertEqual(len(results), 6)
+        for h, result in zip(recommendations, results):
+            self.assertEqual(result.n_recommended, h.count_edges())
+            self.assertAlmostEqual(result.precision, precision(h, testing_set))
+            self.assertAlmostEqual(result.recall, recall(h, testing_set))
+        
+        csr_results = evaluate_batch([CSRGraph.from_digraph(h) for h in recommendations],
+                                     CSRGraph.from_digraph(testing_set))
+        self.assertListEqual(csr_results, results)
+        mixed_results = evaluate_batch(recommendations, CSRGraph.from_digraph(testing_set))
+        self.assertListEqual(mixed_results, results)
+        
+    def test_count_common_edges(self):
+        g, vertices = generate_linear_graph(6, circular=False)
+        h = DiGraph()
+        h.add_edge(vertices[0], vertices[1])
+        h.add_edge(vertices[1], vertices[3])
+        h.add_edge(vertices[5], vertices[4])
+        h.add_edge("x", vertices[0])
+        
+        for a in [g, CSRGraph.from_digraph(g)]:
+            for b in [h, CSRGraph.from_digraph(h)]:
+                self.assertEqual(count_common_edges(a, b), 2)
+                self.assertEqual(count_common_edges(b, a), 2)
+
+        
+    def test_evaluate_depth_sweep(self):
+        g, vertices = generate_linear_graph(12, circular=True)
+        g.add_edge(vertices[0], vertices[6])
+        testing_set = DiGraph()
+        for i in range(12):
+            testing_set.add_edge(vertices[i], vertices[(i + 3) % 12])
+            testing_set.add_edge(vertices[i], vertices[(i + 5) % 12])
+        
+        recommendations = [recommend_all_friends(g, max_depth) for max_depth in range(1, 7)]
+        
+        self.assertListEqual(evaluate_depth_sweep(g, testing_set, 6),
+                             evaluate_batch(recommendations, testing_set))
+
+
+if __name__ == "__main__":
+    unittest.main()
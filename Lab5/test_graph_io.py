@@ -0,0 +1,160 @@
+import unittest
+
+import os
+import tempfile
+
+from graph_io import csr_from_edge_batches
+from graph_io import iter_edge_batches
+from graph_io import load_csr
+from graph_io import load_data_csr
+from graph_io import load_edge_arrays
+from graph_io import open_snapshot
+from graph_io import save_snapshot
+from graphs import DiGraph
+from graphs import load_data
+from graphs import recommend_all_friends
+
+TRAINING_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "facebook_data", "training_set.tsv")
+TESTING_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "facebook_data", "testing_set.tsv")
+
+def named_edges(G):
+    """
+    Returns the edges of the DiGraph G as a set of (name, name) tuples.
+    """
+    return set((u.name, v.name) for u, v in G.edge_set())
+
+class TestEdgeLoader(unittest.TestCase):
+    def setUp(self):
+        fd, self.flname = tempfile.mkstemp(suffix=".tsv")
+        with os.fdopen(fd, "w") as fl:
+            # no trailing newline on the last line
+            fl.write("1\t2\n2\t1\n10\t2\n1\t2\n300\t4000")
+
+    def tearDown(self):
+        os.remove(self.flname)
+
+    def test_load_edge_arrays(self):
+        src, dst = load_edge_arrays(self.flname)
+        
+        self.assertListEqual(list(src), [1, 2, 10, 1, 300])
+        self.assertListEqual(list(dst), [2, 1, 2, 2, 4000])
+        
+    def test_small_chunks(self):
+        """
+        Chunks are cut at line boundaries, even when a chunk
+        is shorter than a line.
+        """
+        batches = list(iter_edge_batches(self.flname, chunk_bytes=3))
+        
+        self.assertEqual(len(batches), 5)
+        for src, dst in batches:
+            self.assertEqual(len(src), 1)
+            self.assertEqual(len(dst), 1)
+        
+    def test_csr_from_edge_batches(self):
+        C = csr_from_edge_batches(iter_edge_batches(self.flname, chunk_bytes=8))
+        
+        self.assertEqual(C.count_vertices(), 5)
+        # the duplicate 1 -> 2 edge is dropped
+        self.assertEqual(C.count_edges(), 4)
+        self.assertListEqual([v.name for v in C.vertices], ["1", "2", "10", "300", "4000"])
+        
+    def test_empty_file(self):
+        fd, flname = tempfile.mkstemp(suffix=".tsv")
+        os.close(fd)
+        try:
+            self.assertListEqual(list(iter_edge_batches(flname)), [])
+            self.assertEqual(csr_from_edge_batches(iter_edge_batches(flname)).count_vertices(), 0)
+        finally:
+            os.remove(flname)
+        
+    def test_matches_load_data(self):
+        G1, G2 = load_data(TRAINING_SET, TESTING_SET)
+        C1, C2 = load_data_csr(TRAINING_SET, TESTING_SET, chunk_bytes=4096)
+        
+        self.assertEqual(C1.count_vertices(), G1.count_vertices())
+        self.assertEqual(C2.count_vertices(), G2.count_vertices())
+        self.assertSetEqual(named_edges(C1.to_digraph()), named_edges(G1))
+        self.assertSetEqual(named_edges(C2.to_digraph()), named_edges(G2))
+        
+        # both graphs share Vertex objects
+        shared = set(C1.vertices).intersection(C2.vertices)
+        self.assertGreater(len(shared), 0)
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        
+    def test_round_trip(self):
+        G1, G2 = load_data(TRAINING_SET, TESTING_SET)
+        training_flname = os.path.join(self.tmpdir.name, "training.csrg")
+        testing_flname = os.path.join(self.tmpdir.name, "testing.csrg")
+        save_snapshot(G1, training_flname)
+        save_snapshot(G2, testing_flname)
+        
+        vertices = dict()
+        C1 = open_snapshot(training_flname, vertices, verify=True)
+        C2 = open_snapshot(testing_flname, vertices, verify=True)
+        
+        self.assertEqual(C1.count_vertices(), G1.count_vertices())
+        self.assertEqual(C1.count_edges(), G1.count_edges())
+        self.assertSetEqual(named_edges(C1.to_digraph()), named_edges(G1))
+        self.assertSetEqual(named_edges(C2.to_digraph()), named_edges(G2))
+        self.assertGreater(len(set(C1.vertices).intersection(C2.vertices)), 0)
+        
+        expected = recommend_all_friends(G1, 1)
+        observed = recommend_all_friends(C1, 1)
+        self.assertSetEqual(named_edges(observed), named_edges(expected))
+        
+    def test_shared_vertex_cache(self):
+        """
+        A graph loaded with load_csr and a snapshot opened with the same
+        vertex_cache share their Vertex objects.
+        """
+        vertices = dict()
+        C1 = load_csr(TRAINING_SET, vertices)
+        flname = os.path.join(self.tmpdir.name, "training.csrg")
+        save_snapshot(C1, flname)
+        
+        C2 = open_snapshot(flname, vertices)
+        
+        for i in range(C1.count_vertices()):
+            self.assertIs(C2.vertices[i], C1.vertices[i])
+        
+    def test_plain_vertices(self):
+        g = DiGraph()
+        g.add_edge("a", "b")
+        g.add_edge("b", "c")
+        g.add_vertex("d")
+        flname = os.path.join(self.tmpdir.name, "g.csrg")
+        save_snapshot(g, flname)
+        
+        C = open_snapshot(flname)
+        
+        self.assertListEqual([v.name for v in C.vertices], ["a", "b", "c", "d"])
+        self.assertSetEqual(named_edges(C.to_digraph()), set([("a", "b"), ("b", "c")]))
+        
+    def test_corrupt(self):
+        g = DiGraph()
+        g.add_edge("a", "b")
+        flname = os.path.join(self.tmpdir.name, "g.csrg")
+        save_snapshot(g, flname)
+        with open(flname, "r+b") as fl:
+            fl.seek(-1, os.SEEK_END)
+            fl.write(b"z")
+        
+        open_snapshot(flname)
+        with self.assertRaises(ValueError):
+            open_snapshot(flname, verify=True)
+            
+        with open(flname, "wb") as fl:
+            fl.write(b"not a snapshot")
+        with self.assertRaises(ValueError):
+            open_snapshot(flname)
+
+
+if __name__ == "__main__":
+    unittest.main()
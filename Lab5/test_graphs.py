@@ -1,12 +1,28 @@
 import unittest
 
+import math
 import random
+import sys
 
+from graphs import as_csr
 from graphs import bfs
+from graphs import bfs_search
+from graphs import bitset_bfs
+from graphs import CSRGraph
 from graphs import DiGraph
+from graphs import IncrementalRecommender
+from graphs import precision
 from graphs import recommend_all_friends
+from graphs import recommend_all_friends_by_depth
+from graphs import recommend_all_friends_msbfs
+from graphs import recommend_all_friends_parallel
+from graphs import recall
 from graphs import recommend_friends_for_user
+from graphs import recommend_top_k_friends
+from graphs import score_candidates
+from graphs import top_k_friends_for_user
 from graphs import Vertex
+from graphs import VertexTable
 
 def extract_bfs_tree(G):
     """
@@ -73,6 +89,165 @@ class TestRecommendationAllFriends(unittest.TestCase):
         
         
     
+class TestRecommendAllFriendsByDepth(unittest.TestCase):
+    def test_matches_recommend_all_friends(self):
+        """
+        The graph for each depth should match a separate
+        recommend_all_friends call with that max_depth.
+        """
+        g, vertices = generate_linear_graph(11, circular=True)
+        g.add_edge(vertices[0], vertices[5])
+        g.add_edge(vertices[2], vertices[8])
+        
+        graphs = recommend_all_friends_by_depth(g, 6)
+        
+        self.assertEqual(len(graphs), 6)
+        for max_depth in range(1, 7):
+            expected = recommend_all_friends(g, max_depth)
+            self.assertSetEqual(graphs[max_depth - 1].edge_set(), expected.edge_set())
+            self.assertEqual(graphs[max_depth - 1].count_edges(), expected.count_edges())
+    
+class TestRecommendAllFriendsMSBFS(unittest.TestCase):
+    def test_matches_recommend_all_friends(self):
+        """
+        The multi-source recommendations should match recommend_all_friends,
+        including when the batch size does not divide the number of users.
+        """
+        g, vertices = generate_linear_graph(13, circular=True)
+        g.add_edge(vertices[0], vertices[6])
+        g.add_edge(vertices[9], vertices[3])
+        
+        for max_depth in range(1, 5):
+            expected = recommend_all_friends(g, max_depth)
+            for batch_size in [1, 4, 64]:
+                observed = recommend_all_friends_msbfs(g, max_depth, batch_size)
+                self.assertSetEqual(observed.edge_set(), expected.edge_set())
+                self.assertEqual(observed.count_edges(), expected.count_edges())
+    
+def generate_friends_graph():
+    """
+    Generates a small undirected friendship graph (both directions of
+    every edge are added):
+        a - b, a - c, b - d, c - d, c - e, b - f
+    """
+    g = DiGraph()
+    for u, v in [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("c", "e"), ("b", "f")]:
+        g.add_edge(u, v)
+        g.add_edge(v, u)
+    return g
+
+class TestTopKRecommendations(unittest.TestCase):
+    def test_scores(self):
+        g = generate_friends_graph()
+        c = CSRGraph.from_digraph(g)
+        a = c.vertex_id("a")
+        d, e, f = c.vertex_id("d"), c.vertex_id("e"), c.vertex_id("f")
+        
+        scores = score_candidates(c, a, "common_neighbors")
+        self.assertDictEqual(scores, {d: 2, e: 1, f: 1})
+        
+        scores = score_candidates(c, a, "jaccard")
+        self.assertAlmostEqual(scores[d], 1.0)
+        self.assertAlmostEqual(scores[e], 0.5)
+        self.assertAlmostEqual(scores[f], 0.5)
+        
+        scores = score_candidates(c, a, "adamic_adar")
+        self.assertAlmostEqual(scores[d], 2 / math.log(3))
+        self.assertAlmostEqual(scores[e], 1 / math.log(3))
+        
+        with self.assertRaises(ValueError):
+            score_candidates(c, a, "katz")
+        
+    def test_top_k_friends_for_user(self):
+        g = generate_friends_graph()
+        
+        recommendations = top_k_friends_for_user(g, "a", 2, "common_neighbors")
+        
+        # ties are broken in favor of the vertex added first
+        self.assertListEqual(recommendations, [("d", 2), ("e", 1)])
+        self.assertEqual(len(top_k_friends_for_user(g, "a", 10)), 3)
+        self.assertListEqual(top_k_friends_for_user(g, "a", 0), [])
+        
+    def test_recommend_top_k_friends(self):
+        g = generate_friends_graph()
+        
+        h = recommend_top_k_friends(g, 1, "common_neighbors")
+        
+        self.assertTrue(h.edge_exists("a", "d"))
+        self.assertTrue(h.edge_exists("d", "a"))
+        for u, v in h.edge_set():
+            self.assertFalse(g.edge_exists(u, v))
+            self.assertNotEqual(u, v)
+    
+    def test_directed_jaccard(self):
+        g = DiGraph()
+        g.add_edge("s", "w")
+        g.add_edge("w", "v")
+        g.add_edge("x", "v")
+        
+        # N(s) = {w}, In(v) = {w, x}
+        self.assertListEqual(top_k_friends_for_user(g, "s", 3, "jaccard"), [("v", 0.5)])
+        
+    def test_as_csr(self):
+        g = generate_friends_graph()
+        c = as_csr(g)
+        
+        self.assertIs(as_csr(g), c)
+        self.assertIs(as_csr(c), c)
+        g.add_edge("a", "d")
+        self.assertIsNot(as_csr(g), c)
+        self.assertTrue(as_csr(g).edge_exists("a", "d"))
+    
+class TestIncrementalRecommender(unittest.TestCase):
+    def test_random_edges(self):
+        """
+        After every added edge the maintained recommendations and
+        scores should match a full recomputation.
+        """
+        rng = random.Random(5)
+        g, vertices = generate_linear_graph(15, circular=False)
+        testing_set = DiGraph()
+        for _ in range(30):
+            testing_set.add_edge(rng.choice(vertices), rng.choice(vertices))
+        
+        for max_depth in range(0, 4):
+            g, vertices = generate_linear_graph(15, circular=False)
+            incremental = IncrementalRecommender(g, max_depth, testing_set)
+            for _ in range(25):
+                u = rng.choice(vertices)
+                v = rng.choice(vertices + [Vertex(name="new")])
+                incremental.add_edge(u, v)
+                vertices = list(g._edges.keys())
+                
+                expected = recommend_all_friends(g, max_depth)
+                self.assertSetEqual(incremental.recommendations.edge_set(), expected.edge_set())
+                self.assertAlmostEqual(incremental.precision(), precision(expected, testing_set))
+                self.assertAlmostEqual(incremental.recall(), recall(expected, testing_set))
+                
+    def test_existing_edge(self):
+        g, vertices = generate_linear_graph(5, circular=False)
+        incremental = IncrementalRecommender(g, 2)
+        before = incremental.recommendations.edge_set()
+        
+        incremental.add_edge(vertices[0], vertices[1])
+        
+        self.assertSetEqual(incremental.recommendations.edge_set(), before)
+        self.assertEqual(incremental.recall(), 0.0)
+    
+class TestRecommendAllFriendsParallel(unittest.TestCase):
+    def test_matches_serial(self):
+        """
+        The parallel recommendations should be identical to
+        the serial ones for every max_depth.
+        """
+        g, vertices = generate_linear_graph(9, circular=True)
+        g.add_edge(vertices[0], vertices[4])
+        
+        for max_depth in range(1, 4):
+            expected = recommend_all_friends(g, max_depth)
+            observed = recommend_all_friends_parallel(g, max_depth, processes=2, chunksize=2)
+            self.assertSetEqual(observed.edge_set(), expected.edge_set())
+    
 class TestRecommendationsForUser(unittest.TestCase):
     def test_complete4_d1(self):
         """
@@ -183,6 +358,177 @@ class TestBFS(unittest.TestCase):
         self.assertEqual(t.count_edges(), g.count_edges() / 2)
         self.assertEqual(t.count_vertices(), g.count_vertices())
 
+class TestCSRGraph(unittest.TestCase):
+    def test_from_digraph(self):
+        g, vertices = generate_linear_graph(5, circular=False)
+        c = CSRGraph.from_digraph(g)
+        
+        self.assertEqual(c.count_vertices(), g.count_vertices())
+        self.assertEqual(c.count_edges(), g.count_edges())
+        for u in vertices:
+            self.assertSetEqual(c.get_outgoing_edges(u), g.get_outgoing_edges(u))
+            for v in vertices:
+                self.assertEqual(c.edge_exists(u, v), g.edge_exists(u, v))
+        
+        self.assertSetEqual(c.to_digraph().edge_set(), g.edge_set())
+        
+    def test_bfs_linear5(self):
+        g, vertices = generate_linear_graph(5, circular=False)
+        c = CSRGraph.from_digraph(g)
+        
+        table = bfs(c, vertices[0])
+        
+        self.assertListEqual(list(table.d), [0, 1, 2, 3, 4])
+        self.assertListEqual(list(table.pi), [-1, 0, 1, 2, 3])
+        for i in range(5):
+            self.assertEqual(table.color_name(i), "BLACK")
+        # vertex attributes are not touched
+        for v in vertices[1:]:
+            self.assertEqual(v.color, "WHITE")
+        
+    def test_recommend_friends_for_user(self):
+        g, vertices = generate_linear_graph(5, circular=False)
+        c = CSRGraph.from_digraph(g)
+        
+        for max_depth in range(4):
+            recommendations = recommend_friends_for_user(c, vertices[0], max_depth)
+            self.assertListEqual(recommendations, vertices[1:max_depth + 1])
+        
+    def test_recommend_all_friends(self):
+        g, vertices = generate_linear_graph(7, circular=True)
+        g.add_edge(vertices[0], vertices[3])
+        c = CSRGraph.from_digraph(g)
+        
+        for max_depth in range(1, 4):
+            expected = recommend_all_friends(g, max_depth)
+            observed = recommend_all_friends(c, max_depth)
+            self.assertSetEqual(observed.edge_set(), expected.edge_set())
+
+class TestBFSSearch(unittest.TestCase):
+    def test_linear5(self):
+        """
+        Tests the stateless search on a linear graph with 5 vertices.
+        The Vertex attributes should not be modified.
+        """
+        g, vertices = generate_linear_graph(5, circular=False)
+        
+        d, pi = bfs_search(g, vertices[0])
+        
+        self.assertListEqual(list(d.keys()), vertices)
+        for i, v in enumerate(vertices):
+            self.assertEqual(d[v], i)
+            self.assertEqual(v.color, "WHITE")
+        self.assertEqual(pi[vertices[0]], None)
+        for i in range(1, 5):
+            self.assertEqual(pi[vertices[i]], vertices[i - 1])
+            
+    def test_max_depth(self):
+        """
+        Only vertices within max_depth are visited.
+        """
+        g, vertices = generate_linear_graph(5, circular=False)
+        
+        for max_depth in range(5):
+            d, pi = bfs_search(g, vertices[0], max_depth)
+            self.assertListEqual(list(d.keys()), vertices[:max_depth + 1])
+
+    def test_negative_max_depth(self):
+        """
+        A negative max_depth visits nothing but the source, as before,
+        for both the DiGraph and the CSRGraph versions.
+        """
+        g, vertices = generate_linear_graph(6, circular=False)
+        d, pi = bfs_search(g, vertices[0], -1)
+        self.assertListEqual(list(d.keys()), [vertices[0]])
+        self.assertListEqual(recommend_friends_for_user(g, vertices[0], -1), [])
+        self.assertEqual(vertices[1].color, "GRAY")
+        self.assertEqual(recommend_all_friends(g, -1).count_edges(), 0)
+        c = CSRGraph.from_digraph(g)
+        self.assertListEqual(recommend_friends_for_user(c, vertices[0], -1), [])
+        self.assertEqual(recommend_all_friends(c, -1).count_edges(), 0)
+
+class TestBitsetBFS(unittest.TestCase):
+    def check_levels(self, g, s, max_depth=None, **kwargs):
+        """
+        Compares the levels of bitset_bfs with the depths found by bfs_search.
+        """
+        c = CSRGraph.from_digraph(g)
+        levels = bitset_bfs(c, c.vertex_id(s), max_depth, **kwargs)
+        d, pi = bfs_search(g, s, max_depth)
+        
+        expected = [0] * (max(d.values()) + 1)
+        for v, depth in d.items():
+            expected[depth] |= 1 << c.vertex_id(v)
+        self.assertListEqual(levels, expected)
+        
+    def test_complete5(self):
+        g, vertices = generate_complete_graph(5)
+        
+        self.check_levels(g, vertices[0])
+        self.check_levels(g, vertices[0], 0)
+        
+    def test_linear9(self):
+        g, vertices = generate_linear_graph(9, circular=True)
+        
+        for max_depth in [None, 1, 2, 3]:
+            self.check_levels(g, vertices[2], max_depth)
+            
+    def test_random_directed(self):
+        """
+        Forces each expansion strategy on a random directed graph.
+        """
+        rng = random.Random(3)
+        g, vertices = generate_linear_graph(40, circular=False)
+        for _ in range(120):
+            g.add_edge(rng.choice(vertices), rng.choice(vertices))
+        
+        for s in vertices[:5]:
+            self.check_levels(g, s)
+            # always top-down
+            self.check_levels(g, s, alpha=0, beta=1)
+            # always bottom-up
+            self.check_levels(g, s, alpha=10 ** 9, beta=10 ** 9)
+
+class TestVertex(unittest.TestCase):
+    def test_slots(self):
+        v = Vertex(name="a")
+        
+        self.assertEqual(v.color, "WHITE")
+        self.assertFalse(hasattr(v, "__dict__"))
+        with self.assertRaises(AttributeError):
+            v.colour = "BLACK"
+            
+    def test_vertex_table(self):
+        table = VertexTable(3)
+        
+        self.assertEqual(len(table), 3)
+        for i in range(3):
+            self.assertEqual(table.color_name(i), "WHITE")
+            self.assertEqual(table.d[i], sys.maxsize)
+            self.assertEqual(table.pi[i], -1)
+            
+        table.color[1] = VertexTable.BLACK_ID
+        table.d[1] = 2
+        table.pi[1] = 0
+        table.reset()
+        self.assertEqual(table.color_name(1), "WHITE")
+        self.assertEqual(table.d[1], sys.maxsize)
+        self.assertEqual(table.pi[1], -1)
+        
+    def test_bfs_unreached(self):
+        """
+        Vertices the search does not reach keep their initial state.
+        """
+        g, vertices = generate_linear_graph(3, circular=False)
+        g.add_vertex(Vertex(name="isolated"))
+        c = CSRGraph.from_digraph(g)
+        
+        table = bfs(c, vertices[2])
+        
+        self.assertListEqual(list(table.d), [2, 1, 0, sys.maxsize])
+        self.assertEqual(table.color_name(3), "WHITE")
+        self.assertEqual(table.pi[3], -1)
+        
 class TestGraph(unittest.TestCase):
     def test_init(self):
         g = DiGraph()
@@ -247,6 +593,75 @@ class TestGraph(unittest.TestCase):
         neighbors_a = g.get_outgoing_edges("a")
         self.assertSetEqual(neighbors_a, set(["b"]))
         
+    def test_edges(self):
+        g, vertices = generate_linear_graph(4, circular=False)
+        h, _ = generate_complete_graph(3)
+        h.add_edge(vertices[0], vertices[1])
+        h.add_edge(vertices[3], vertices[2])
+        h.add_edge(vertices[1], vertices[3])
+        
+        edges = g.edges()
+        
+        self.assertEqual(len(edges), 6)
+        self.assertIn((vertices[0], vertices[1]), edges)
+        self.assertNotIn((vertices[0], vertices[2]), edges)
+        self.assertSetEqual(set(edges), g.edge_set())
+        self.assertEqual(edges, g.edge_set())
+        
+        self.assertEqual(edges.intersection_size(h.edges()), 2)
+        self.assertEqual(h.edges().intersection_size(edges), 2)
+        self.assertSetEqual(edges.intersection(h.edges()), g.edge_set().intersection(h.edge_set()))
+        
+        # anything that is not a pair is not an edge
+        self.assertNotIn("ab", edges)
+        self.assertNotIn((vertices[0], vertices[1], vertices[2]), edges)
+        self.assertTrue(edges.isdisjoint([1, "x", (1, 2, 3)]))
+        self.assertFalse(edges >= set([1]))
+        
+        # the view reflects later changes
+        g.add_edge(vertices[0], vertices[2])
+        self.assertEqual(len(edges), 7)
+        self.assertIn((vertices[0], vertices[2]), edges)
+        
+    def test_remove_edge(self):
+        g = DiGraph()
+        g.add_edge("a", "b")
+        g.add_edge("b", "a")
+        
+        g.remove_edge("a", "b")
+        g.remove_edge("a", "c")
+        
+        self.assertFalse(g.edge_exists("a", "b"))
+        self.assertTrue(g.edge_exists("b", "a"))
+        self.assertTrue(g.vertex_exists("a"))
+        self.assertEqual(g.count_edges(), 1)
+        
+    def test_count_edges_duplicates(self):
+        g = DiGraph()
+        
+        g.add_edge("a", "b")
+        g.add_edge("a", "b")
+        g.add_vertex("a")
+        
+        self.assertEqual(g.count_edges(), 1)
+        
+    def test_precision_recall(self):
+        recommendations = DiGraph()
+        recommendations.add_edge("a", "b")
+        recommendations.add_edge("a", "c")
+        recommendations.add_edge("b", "c")
+        recommendations.add_edge("c", "a")
+        
+        testing_set = DiGraph()
+        testing_set.add_edge("a", "b")
+        testing_set.add_edge("c", "a")
+        testing_set.add_edge("d", "a")
+        
+        self.assertAlmostEqual(precision(recommendations, testing_set), 2.0 / 4.0)
+        self.assertAlmostEqual(recall(recommendations, testing_set), 2.0 / 3.0)
+        self.assertEqual(precision(DiGraph(), testing_set), 0.0)
+        self.assertEqual(recall(recommendations, DiGraph()), 0.0)
+        
     def test_vertex_exists(self):
         g = DiGraph()
         
@@ -0,0 +1,95 @@
+import unittest
+
+import asyncio
+import json
+import os
+import tempfile
+
+from service import RecommendationService
+from test_graphs import generate_linear_graph
+
+class TestRecommendationService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.g, self.vertices = generate_linear_graph(6, circular=False)
+        self.service = RecommendationService(self.g, max_depth=2, batch_window=0.05, workers=2)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "recommendations.sock")
+        self.server = await self.service.serve_unix(self.path)
+        
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.service.close()
+        self.tmpdir.cleanup()
+        
+    async def query(self, lines):
+        """
+        Sends the request lines on one connection and returns the decoded responses.
+        """
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        for line in lines:
+            writer.write(line.encode("utf-8") + b"\n")
+        await writer.drain()
+        writer.write_eof()
+        responses = [json.loads(line) async for line in reader]
+        writer.close()
+        return responses
+        
+    async def test_recommend(self):
+        responses = await self.query(['{"user": 0, "id": 1}', '{"user": "2", "max_depth": 1, "id": 2}'])
+        
+        by_id = {response["id"]: response for response in responses}
+        self.assertListEqual(by_id[1]["recommendations"], ["1", "2"])
+        self.assertEqual(by_id[1]["max_depth"], 2)
+        self.assertSetEqual(set(by_id[2]["recommendations"]), set(["1", "3"]))
+        
+    async def test_batching(self):
+        """
+        Concurrent requests within the batch window share one batch,
+        and duplicate requests are computed once.
+        """
+        results = await asyncio.gather(*[self.service.recommend(str(i % 3)) for i in range(9)])
+        
+        self.assertEqual(self.service.batches, 1)
+        self.assertEqual(self.service.cache.info().misses, 3)
+        self.assertListEqual(results[0], ["1", "2"])
+        self.assertListEqual(results[3], results[0])
+        
+    async def test_errors(self):
+        responses = await self.query(['{"user": "nobody", "id": 1}', 'not json', '[1, 2]'])
+        
+        self.assertEqual(len(responses), 3)
+        for response in responses:
+            self.assertIn("error", response)
+        with self.assertRaises(KeyError):
+            await self.service.recommend("nobody")
+        
+    async def test_bad_max_depth(self):
+        responses = await self.query(['{"user": "0", "max_depth": 1e400}',
+                                      '{"user": "0", "max_depth": -1}',
+                                      '{"user": "0", "max_depth": 5}',
+                                      '{"user": "0", "max_depth": "two"}'])
+        
+        self.assertEqual(len(responses), 4)
+        for response in responses:
+            self.assertTrue(response["error"].startswith("bad request"))
+        with self.assertRaises(ValueError):
+            await self.service.recommend("0", -1)
+
+    async def test_close(self):
+        """
+        Requests still waiting for their batch fail when the service is
+        closed instead of hanging.
+        """
+        service = RecommendationService(self.g, batch_window=10)
+        request = asyncio.ensure_future(service.recommend("0"))
+        await asyncio.sleep(0.01)
+        
+        await asyncio.wait_for(service.close(), 1)
+        
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(request, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+import random
+
+from graphs import bfs_search
+from graphs import CSRGraph
+from graphs import recommend_all_friends
+from sparse import common_neighbor_counts
+from sparse import multiply_rows
+from sparse import reachability
+from sparse import recommend_all_friends_sparse
+from sparse import to_scipy_csr
+from test_graphs import generate_complete_graph
+from test_graphs import generate_linear_graph
+
+try:
+    import scipy
+    HAVE_SCIPY = True
+except ImportError:
+    HAVE_SCIPY = False
+
+def random_graph(n_vertices, n_edges, seed):
+    """
+    Generates a linear graph with extra random (directed) edges.
+    """
+    rng = random.Random(seed)
+    g, vertices = generate_linear_graph(n_vertices, circular=False)
+    for _ in range(n_edges):
+        g.add_edge(rng.choice(vertices), rng.choice(vertices))
+    return g, vertices
+
+class TestSparse(unittest.TestCase):
+    def test_multiply_rows(self):
+        g, vertices = generate_linear_graph(4, circular=False)
+        c = CSRGraph.from_digraph(g)
+        
+        # e_0 A = row 0 of A, (e_1 + 2 e_2) A
+        products = multiply_rows(c, [{0: 1}, {1: 1, 2: 2}])
+        
+        self.assertDictEqual(products[0], {1: 1})
+        self.assertDictEqual(products[1], {0: 1, 2: 1, 1: 2, 3: 2})
+        
+    def test_common_neighbor_counts(self):
+        g, vertices = generate_complete_graph(5)
+        c = CSRGraph.from_digraph(g)
+        
+        rows = dict(common_neighbor_counts(c, block_size=2))
+        
+        self.assertEqual(len(rows), 5)
+        for u in range(5):
+            for v in range(5):
+                # 4 paths back to u, 3 common neighbors otherwise
+                self.assertEqual(rows[u][v], 4 if u == v else 3)
+        
+    def test_reachability(self):
+        g, vertices = random_graph(30, 40, seed=7)
+        c = CSRGraph.from_digraph(g)
+        
+        for max_depth in range(4):
+            rows = dict(reachability(c, max_depth, block_size=8))
+            self.assertEqual(len(rows), 30)
+            for u, reached in rows.items():
+                expected = set(c.vertex_id(v) for v in bfs_search(g, vertices[u], max_depth)[0])
+                expected.discard(u)
+                self.assertSetEqual(reached, expected)
+        
+    def test_recommend_all_friends_sparse(self):
+        g, vertices = random_graph(30, 40, seed=11)
+        g.add_edge(vertices[3], vertices[3])
+        
+        for max_depth in range(4):
+            expected = recommend_all_friends(g, max_depth)
+            observed = recommend_all_friends_sparse(g, max_depth, block_size=7)
+            self.assertSetEqual(observed.edge_set(), expected.edge_set())
+            
+    @unittest.skipUnless(HAVE_SCIPY, "scipy is not installed")
+    def test_to_scipy_csr(self):
+        g, vertices = generate_linear_graph(4, circular=False)
+        
+        m = to_scipy_csr(g)
+        
+        self.assertEqual(m.shape, (4, 4))
+        self.assertEqual(m.nnz, g.count_edges())
+        self.assertEqual(m[0, 1], 1)
+        self.assertEqual(m[0, 2], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()